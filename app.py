@@ -1,277 +1,179 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify
+from flask import Flask, Blueprint, current_app, render_template, request, send_file, flash, redirect, url_for, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import os
-import pandas as pd
-import tempfile
-from pathlib import Path
+import re
+import numpy as np
+import threading
 import subprocess
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from datetime import datetime, timedelta
 import sys
-
-app = Flask(__name__)
-# Use environment variable for production, fallback for development
-app.secret_key = os.environ.get('SECRET_KEY', 'dev_key_change_in_production_' + str(os.urandom(24).hex()))
-
-# Security: CORS Protection (only allow your domain in production)
-CORS(app, resources={
-    r"/api/*": {
-        "origins": os.environ.get('ALLOWED_ORIGINS', '*').split(',')
-    }
-})
-
-# Security: Rate Limiting (prevent abuse)
+import time
+from charts import CHARTS, get_chart, warm_up_from_env
+from leaderboards import BOARDS, get_leaderboards
+from artist_songs import get_artist_songs
+import artist_songs
+import artwork
+import assets
+import chart_share
+import exports
+import image_proxy
+import leaderboards
+import movers
+import payload_cache
+import singleflight
+import search
+import similarity
+
+# Importing this module is cheap: chart data, the Spotify client and the Kaggle
+# update check are all deferred to create_app() or first use.
+main = Blueprint('main', __name__)
+
+# Security: Rate Limiting (prevent abuse) - attached to the app in create_app()
 limiter = Limiter(
-    app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
     storage_uri="memory://"
 )
 
-# Spotify API setup (using environment variables for credentials)
-# Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET in environment
-try:
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials())
-    SPOTIFY_ENABLED = True
-except Exception as e:
-    print(f"⚠️  Spotify API not configured: {e}")
-    SPOTIFY_ENABLED = False
-
 # Rate limiting disabled
 DOWNLOAD_LIMIT = None
 download_tracker = {}
 
-# Auto-update Billboard data on startup
-print("Checking for Billboard data updates...")
-try:
-    result = subprocess.run(['python3', 'auto_update_data.py'],
-                          capture_output=True, text=True, timeout=60)
-    if result.returncode == 0:
-        print("✓ Data check complete!")
-except Exception as e:
-    print(f"⚠️  Could not check for updates: {e}")
-
-# Find Billboard Hot 100 data file
-DATA_DIR = Path('data')
-DESKTOP_PATH = Path.home() / 'Desktop' / 'hot100.csv'
-
-# Try current directory first, then data directory, then Desktop
-def find_data_file():
-    # Check current directory
-    for name in ['hot-100-current.csv', 'hot100.csv', 'billboard_hot_100.csv']:
-        filepath = Path(name)
-        if filepath.exists():
-            return filepath
-    # Check data directory
-    if DATA_DIR.exists():
-        for name in ['hot-100-current.csv', 'hot100.csv', 'billboard_hot_100.csv']:
-            filepath = DATA_DIR / name
-            if filepath.exists():
-                return filepath
-    # Check desktop
-    if DESKTOP_PATH.exists():
-        return DESKTOP_PATH
-    raise FileNotFoundError("Billboard data not found! Run auto_update_data.py first.")
-
-BILLBOARD_DATA_PATH = find_data_file()
-
-# Load data once at startup (cached)
-print(f"Loading Billboard Hot 100 data from {BILLBOARD_DATA_PATH.name}...")
-BILLBOARD_DATA = pd.read_csv(BILLBOARD_DATA_PATH, low_memory=False)
-print(f"Loaded {len(BILLBOARD_DATA)} records!")
-
-# Load Billboard 200 data
-BILLBOARD_200_PATH = Path('billboard200.csv')
-if BILLBOARD_200_PATH.exists():
-    print(f"Loading Billboard 200 data from {BILLBOARD_200_PATH.name}...")
-    BILLBOARD_200_DATA = pd.read_csv(BILLBOARD_200_PATH, low_memory=False)
-    print(f"Loaded {len(BILLBOARD_200_DATA)} Billboard 200 records!")
-else:
-    print("⚠️  Billboard 200 data not found. Billboard 200 chart will be unavailable.")
-    BILLBOARD_200_DATA = None
-
-def check_download_limit(ip_address):
-    """Rate limiting disabled - always allow downloads"""
-    return True, 0  # Always allowed
-
-def process_billboard_data(artist_name):
-    """Process Billboard data and return Excel file path"""
-    # Use the pre-loaded data
-    data = BILLBOARD_DATA.copy()
-
-    # Check if all required columns are present
-    required_cols = {'Date', 'Song', 'Artist', 'Rank'}
-    if not required_cols.issubset(data.columns):
-        return None, "Missing required columns: Date, Song, Artist, Rank"
-
-    # Convert the 'Date' column to datetime
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data = data.dropna(subset=['Date'])
+def check_for_data_updates():
+    """Run the Kaggle auto-updater (in the background - it can take up to a minute)"""
+    print("Checking for Billboard data updates...")
+    try:
+        result = subprocess.run([sys.executable, 'auto_update_data.py'],
+                              capture_output=True, text=True, timeout=60)
+        if result.returncode == 0:
+            print("✓ Data check complete!")
+    except Exception as e:
+        print(f"⚠️  Could not check for updates: {e}")
+
+_tracking = False
+
+def track_charts():
+    """Keep every derived index in sync with chart loads and refreshes
+
+    CHARTS is shared by every app the factory builds, so listeners are only
+    subscribed once per process.
+    """
+    global _tracking
+    if _tracking:
+        return
+    _tracking = True
+    for module in (leaderboards, artist_songs, search, movers, similarity, chart_share, payload_cache):
+        module.track_charts(CHARTS)
+
+def create_app():
+    """Application factory
+
+    AUTO_UPDATE_DATA=false skips the Kaggle update check, WARM_CHARTS controls
+    which charts preload in the background (see charts.py).
+    """
+    app = Flask(__name__)
+    # Use environment variable for production, fallback for development
+    app.secret_key = os.environ.get('SECRET_KEY', 'dev_key_change_in_production_' + str(os.urandom(24).hex()))
+
+    # Security: CORS Protection (only allow your domain in production)
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": os.environ.get('ALLOWED_ORIGINS', '*').split(',')
+        }
+    })
 
-    # Clean text fields
-    data['Song'] = data['Song'].str.strip().str.lower()
-    data['Artist'] = data['Artist'].str.strip().str.lower()
+    # RATELIMIT_ENABLED=false turns it off (load tests replay many requests from one IP)
+    app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() != 'false'
+    limiter.init_app(app)
 
-    # Filter by artist
-    filtered_data = data[data['Artist'].str.contains(artist_name.lower(), na=False)]
+    app.register_blueprint(main)
 
-    if filtered_data.empty:
-        return None, f"No results found for artist: {artist_name}"
+    # Fingerprinted static files (static/dist/, written by build_assets.py)
+    app.add_template_global(assets.asset_url)
+    app.add_template_global(assets.font_src)
 
-    # Create a 'Song (Artist)' column
-    filtered_data = filtered_data.copy()
-    filtered_data['Song_Artist'] = (
-        filtered_data['Song'].str.title() + " (" + filtered_data['Artist'].str.title() + ")"
-    )
+    # Auto-update Billboard data on startup; charts pick up new files on refresh
+    if os.environ.get('AUTO_UPDATE_DATA', 'true').lower() != 'false':
+        threading.Thread(target=check_for_data_updates, daemon=True).start()
 
-    # Pivot table using actual dates from the data
-    pivot_table = filtered_data.pivot_table(
-        index='Date',
-        columns='Song_Artist',
-        values='Rank',
-        aggfunc='first'
-    )
+    # Chart datasets are registered in charts.py and loaded lazily on first use.
+    # WARM_CHARTS (default: hot100,billboard200) preloads charts in a background
+    # thread, so every worker's search covers both charts.
+    track_charts()
+    warm_up_from_env()
 
-    # Fill in missing weeks (only those present in the data)
-    all_dates = pd.Series(data['Date'].unique())
-    all_dates = all_dates[all_dates >= filtered_data['Date'].min()]
-    pivot_table = pivot_table.reindex(pd.to_datetime(sorted(all_dates)))
+    return app
 
-    # Sort columns by first appearance
-    first_appearance = filtered_data.groupby('Song_Artist')['Date'].min()
-    sorted_columns = first_appearance.sort_values().index
-    pivot_table = pivot_table[sorted_columns]
+_app = None
 
-    # Format index as text
-    pivot_table.index = pivot_table.index.strftime('%Y-%m-%d')
+def __getattr__(name):
+    """`app` is built on first access, so `gunicorn app:app` keeps working"""
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    # Safe filename for output
-    safe_name = artist_name.title().replace(" ", "_")
-    output_file = os.path.join(tempfile.gettempdir(), f'{safe_name}_Chart_History.xlsx')
-
-    # Save to Excel
-    pivot_table.to_excel(output_file)
-
-    return output_file, None
+def check_download_limit(ip_address):
+    """Rate limiting disabled - always allow downloads"""
+    return True, 0  # Always allowed
 
-@app.route('/')
+@main.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/about')
+@main.route('/about')
 def about():
     return render_template('about.html')
 
-def prepare_visualization_data(artist_name):
-    """Prepare data for visualization"""
-    # Use the pre-loaded data
-    data = BILLBOARD_DATA.copy()
+def era_weeks(chart):
+    """(first, stop) week indexes for the request's from/to parameters (ValueError if invalid)"""
+    return chart.era_weeks(request.values.get('from', '').strip(), request.values.get('to', '').strip())
 
-    # Keep original capitalization - only strip whitespace
-    data['Song_Clean'] = data['Song'].str.strip()
-    data['Artist_Clean'] = data['Artist'].str.strip()
+def prepare_visualization_data(artist_name, first=0, stop=None):
+    """Prepare data for visualization (first page of songs; the rest load via the API)"""
+    chart = get_chart('hot100')
 
-    # Create lowercase versions for matching only
-    data['Song_Lower'] = data['Song_Clean'].str.lower()
-    data['Artist_Lower'] = data['Artist_Clean'].str.lower()
+    def build():
+        index = get_artist_songs(chart, artist_name, first, stop)
+        if index.total == 0:
+            return None
 
-    # Convert dates first for filtering
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data = data.dropna(subset=['Date'])
-
-    # Filter by artist (case-insensitive) and modern era (1990+)
-    filtered_data = data[
-        (data['Artist_Lower'].str.contains(artist_name.lower(), na=False)) &
-        (data['Date'] >= '1990-01-01')
-    ].copy()
-
-    if filtered_data.empty:
-        return None
+        return {
+            'chart_data': index.chart_data(),
+            'songs': index.page(),
+            'stats': index.stats()
+        }
 
-    # Get most common capitalization for each song
-    def get_proper_name(series):
-        # Get the most frequent capitalization
-        return series.mode()[0] if len(series.mode()) > 0 else series.iloc[0]
-
-    # Group and get proper capitalization
-    song_names = {}
-    for song_lower in filtered_data['Song_Lower'].unique():
-        song_versions = filtered_data[filtered_data['Song_Lower'] == song_lower]['Song_Clean']
-        song_names[song_lower] = get_proper_name(song_versions)
-
-    artist_proper = get_proper_name(filtered_data['Artist_Clean'])
-
-    # Create Song_Artist column with proper capitalization
-    filtered_data.loc[:, 'Song_Artist'] = filtered_data['Song_Lower'].map(song_names) + f" ({artist_proper})"
-
-    # Prepare chart data
-    chart_data = {}
-    for song in filtered_data['Song_Artist'].unique():
-        song_data = filtered_data[filtered_data['Song_Artist'] == song][['Date', 'Rank']].copy()
-        song_data = song_data.sort_values('Date')
-        chart_data[song] = [
-            {'date': row['Date'].strftime('%Y-%m-%d'), 'rank': int(row['Rank'])}
-            for _, row in song_data.iterrows()
-        ]
-
-    # Calculate statistics
-    songs_list = []
-    for song in filtered_data['Song_Artist'].unique():
-        song_df = filtered_data[filtered_data['Song_Artist'] == song]
-        # Extract just the song name (before the parenthesis)
-        song_name_only = song.split(' (')[0] if ' (' in song else song
-        first_date = song_df['Date'].min()
-        peak_position = int(song_df['Rank'].min())
-
-        songs_list.append({
-            'name': song,
-            'song_only': song_name_only,
-            'artist_only': artist_proper,
-            'peak': peak_position,
-            'weeks': len(song_df),
-            'first_date': first_date.strftime('%b %Y'),
-            'first_date_sort': first_date,  # For sorting
-            'is_number_one': peak_position == 1  # Flag for #1 songs
-        })
-
-    # Sort by #1 status first (all #1s at top), then by first chart date
-    songs_list.sort(key=lambda x: (not x['is_number_one'], x['first_date_sort']))
-
-    # Calculate top 10 hits and #1 songs
-    top_10_hits = len(filtered_data[filtered_data['Rank'] <= 10]['Song_Artist'].unique())
-    number_ones = len(filtered_data[filtered_data['Rank'] == 1]['Song_Artist'].unique())
-
-    stats = {
-        'total_songs': len(filtered_data['Song_Artist'].unique()),
-        'top_10_hits': top_10_hits,
-        'number_ones': number_ones
-    }
+    # Cached per dataset version; simultaneous searches share one computation
+    return payload_cache.cached('analyze', chart, (artist_name.strip().lower(), first, stop), build)
 
-    return {
-        'chart_data': chart_data,
-        'songs': songs_list,
-        'stats': stats
-    }
-
-@app.route('/analyze', methods=['POST'])
+@main.route('/analyze', methods=['POST'])
 def analyze():
     # Check if artist name is provided
     artist_name = request.form.get('artist_name', '').strip()
     if not artist_name:
         flash('Please enter an artist name', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+
+    era_from = request.form.get('from', '').strip()
+    era_to = request.form.get('to', '').strip()
+    try:
+        first, stop = era_weeks(get_chart('hot100'))
+    except (ValueError, TypeError):
+        flash(f'Invalid era: {era_from or "..."} to {era_to or "..."}', 'error')
+        return redirect(url_for('main.index'))
 
     try:
         # Prepare visualization data
-        viz_data = prepare_visualization_data(artist_name)
+        viz_data = prepare_visualization_data(artist_name, first, stop)
 
         if viz_data is None:
             flash(f'No results found for artist: {artist_name}', 'error')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
 
         # Render results page with visualization
         return render_template(
@@ -279,6 +181,9 @@ def analyze():
             artist_name=artist_name.title(),
             chart_data=viz_data['chart_data'],
             songs=viz_data['songs'],
+            page_size=artist_songs.PAGE_SIZE,
+            era_from=era_from,
+            era_to=era_to,
             total_songs=viz_data['stats']['total_songs'],
             top_10_hits=viz_data['stats']['top_10_hits'],
             number_ones=viz_data['stats']['number_ones']
@@ -286,43 +191,147 @@ def analyze():
 
     except Exception as e:
         flash(f'An error occurred: {str(e)}', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
-@app.route('/api/artists')
+@main.route('/api/artists')
 def get_artists():
-    """API endpoint for artist autocomplete"""
+    """API endpoint for artist autocomplete (?q=&from=&to=)"""
     query = request.args.get('q', '').lower()
+    chart = get_chart('hot100')
+    try:
+        first, stop = era_weeks(chart)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid from or to date'}), 400
 
-    # Get modern artists (1990+) from the dataset
-    modern_data = BILLBOARD_DATA[pd.to_datetime(BILLBOARD_DATA['Date'], errors='coerce') >= '1990-01-01']
-
-    # Get unique artists
-    artists = modern_data['Artist'].str.strip().unique()
-
-    # Filter by query if provided - use startswith instead of contains
-    if query:
-        artists = [a for a in artists if a.lower().startswith(query)]
+    # Credits starting with the query that charted at least once in the era
+    names = chart.artist_names_lower
+    codes = np.flatnonzero(names.str.startswith(query)) if query else np.arange(len(names))
+    lo, hi = chart.artist_row_bounds(codes, first, stop)
+    artists = chart.data['Artist'].cat.categories[codes[hi > lo]]
 
     # Sort and limit to 50 results
-    artists = sorted(artists)[:50]
+    artists = sorted(set(artists))[:50]
 
     return {'artists': list(artists)}
 
-@app.route('/api/artist-info/<artist_name>')
-def get_artist_info(artist_name):
-    """API endpoint for artist information from Spotify (image) + Wikipedia/Billboard overview"""
+@main.route('/api/artist/<path:artist_name>/songs')
+def get_artist_song_page(artist_name):
+    """One page of an artist's songs (?sort=default|peak|weeks|debut&page=&size=&from=&to=)"""
+    sort = request.args.get('sort', artist_songs.DEFAULT_SORT)
+    if sort not in artist_songs.SORTS:
+        return jsonify({'error': f'Unknown sort: {sort}'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    size = min(max(request.args.get('size', artist_songs.PAGE_SIZE, type=int), 1), artist_songs.MAX_PAGE_SIZE)
 
-    # Get Billboard data for statistics
-    modern_data = BILLBOARD_DATA[pd.to_datetime(BILLBOARD_DATA['Date'], errors='coerce') >= '1990-01-01']
-    artist_data = modern_data[modern_data['Artist'].str.strip().str.lower() == artist_name.lower()].copy()
+    chart = get_chart('hot100')
+    try:
+        first, stop = era_weeks(chart)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid from or to date'}), 400
 
-    if artist_data.empty:
+    index = get_artist_songs(chart, artist_name, first, stop)
+    if index.total == 0:
+        return jsonify({'error': 'Artist not found in Billboard data'}), 404
+
+    return jsonify({
+        'artist': index.artist,
+        'sort': sort,
+        'page': page,
+        'size': size,
+        'total': index.total,
+        'pages': -(-index.total // size),
+        'songs': index.page(sort, page, size)
+    })
+
+@main.route('/api/artist/<path:artist_name>/similar')
+def get_similar_artists(artist_name):
+    """Artists who charted alongside / on a similar trajectory (?limit=)"""
+    limit = min(max(request.args.get('limit', 10, type=int), 1), similarity.SIMILAR_TOP_K)
+    chart = get_chart('hot100')
+    index = similarity.get_similarity(chart)
+
+    artist_id = index.artist_id(artist_name)
+    if artist_id is None:
+        # Fall back to the credit the results page shows for this search
+        shown = get_artist_songs(chart, artist_name).artist
+        artist_id = index.artist_id(shown) if shown else None
+    if artist_id is None:
         return jsonify({'error': 'Artist not found in Billboard data'}), 404
 
+    return jsonify(index.neighbours(artist_id, limit))
+
+@main.route('/api/artist/<path:artist_name>/chart-share')
+def get_artist_chart_share(artist_name):
+    """Weekly entries, points (101 - rank) and share of all chart points (?chart=&window=1|4|13|52&from=&to=)"""
+    chart_key = request.args.get('chart', 'hot100')
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
+
+    window = request.args.get('window', 1, type=int)
+    if window not in chart_share.WINDOWS:
+        return jsonify({'error': f'Unknown window: {window}'}), 400
+
+    try:
+        first, stop = era_weeks(chart)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid from or to date'}), 400
+
+    # Same substring match as the results page
+    series = chart_share.get_chart_share(chart).series(chart.artist_codes(artist_name), first, stop, window)
+    if series is None:
+        return jsonify({'error': 'Artist not found in Billboard data'}), 404
+    return jsonify(dict(series, artist=artist_name, chart=chart_key))
+
+@main.route('/api/search')
+def global_search():
+    """Typo-tolerant search across songs, albums and artists (?q=&type=&limit=&chart=)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'results': []})
+
+    limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+    kinds = [k for k in request.args.get('type', '').split(',') if k] or None
+
+    # A search never loads a chart by itself, except the one it names (or the
+    # Hot 100 when nothing is loaded yet); charts still warming up are listed
+    # as skipped instead
+    chart_key = request.args.get('chart')
+    if chart_key:
+        chart = CHARTS.get(chart_key)
+        if chart is None or not chart.available:
+            return jsonify({'error': 'Chart data not available'}), 404
+        targets = {chart_key: chart}
+    else:
+        targets = {key: chart for key, chart in CHARTS.items() if chart.loaded}
+        if not targets:
+            targets = {'hot100': CHARTS['hot100']}
+
+    started = time.time()
+    results = search.search(targets, query, limit=limit, kinds=kinds)
+    searched = [key for key, chart in targets.items() if chart.available]
+    skipped = [] if chart_key else [
+        key for key, chart in CHARTS.items() if key not in targets and chart.available]
+    return jsonify({
+        'query': query,
+        'results': results,
+        'charts_searched': searched,
+        'partial': bool(skipped),
+        'charts_skipped': skipped,
+        'took_ms': round((time.time() - started) * 1000, 2)
+    })
+
+def artist_info(chart, artist_name, first, stop):
+    """Billboard statistics plus image/overview for an artist, or None if they never charted"""
+    rows = chart.artist_rows(chart.artist_codes(artist_name, exact=True), first, stop)
+    artist_data = chart.data.iloc[rows]
+
+    if artist_data.empty:
+        return None
+
     artist_name_proper = artist_data['Artist'].iloc[0].strip()
 
     # Calculate Billboard statistics
-    artist_data['Date'] = pd.to_datetime(artist_data['Date'], errors='coerce')
     total_songs = artist_data['Song'].nunique()
     total_weeks = len(artist_data)
     peak_position = int(artist_data['Rank'].min())
@@ -353,114 +362,16 @@ def get_artist_info(artist_name):
 
     description = " • ".join(description_parts)
 
-    # Initialize defaults
-    image_url = None
-    spotify_url = None
-    overview = description  # Use Billboard description as default
-
-    # Try to fetch from Wikipedia first (image + description)
-    try:
-        import requests
-
-        # Try multiple Wikipedia search variations for disambiguation
-        wiki_attempts = [
-            artist_name_proper,  # Original name
-            f"{artist_name_proper} (musician)",
-            f"{artist_name_proper} (rapper)",
-            f"{artist_name_proper} (singer)",
-            f"{artist_name_proper} (band)"
-        ]
-
-        for attempt_name in wiki_attempts:
-            try:
-                wiki_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{requests.utils.quote(attempt_name)}"
-                response = requests.get(wiki_url, timeout=10, headers={'User-Agent': 'Mozilla/5.0 BillboardAnalyzer/1.0'})
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    # Check if this is a disambiguation page
-                    page_type = data.get('type', '')
-                    if page_type == 'disambiguation':
-                        print(f"✗ Disambiguation page for {attempt_name}, trying next...")
-                        continue
-
-                    print(f"✓ Wikipedia page found for {attempt_name}")
-
-                    # Get Wikipedia image (try multiple sources)
-                    if 'originalimage' in data and data['originalimage'] and 'source' in data['originalimage']:
-                        image_url = data['originalimage']['source']
-                        print(f"✓ Found originalimage: {image_url}")
-                    elif 'thumbnail' in data and data['thumbnail'] and 'source' in data['thumbnail']:
-                        # Use larger thumbnail - replace size in URL
-                        thumb_url = data['thumbnail']['source']
-                        image_url = thumb_url.replace('/50px-', '/600px-').replace('/100px-', '/600px-').replace('/200px-', '/600px-').replace('/300px-', '/600px-')
-                        print(f"✓ Found thumbnail (enlarged): {image_url}")
-
-                    # Get Wikipedia description
-                    if 'extract' in data and data['extract']:
-                        wiki_extract = data['extract']
-                        # Use first 2 sentences from Wikipedia
-                        sentences = wiki_extract.split('. ')
-                        if len(sentences) >= 2:
-                            overview = '. '.join(sentences[:2]) + '.'
-                        else:
-                            overview = wiki_extract
-                        print(f"✓ Got Wikipedia description: {len(overview)} chars")
-
-                    # Found valid page, stop trying
-                    break
-
-            except Exception as inner_e:
-                print(f"✗ Error trying {attempt_name}: {inner_e}")
-                continue
-
-        print(f"Wikipedia final: image_url={image_url is not None}, overview_len={len(overview) if overview else 0}")
-    except Exception as e:
-        print(f"✗ Wikipedia API error for {artist_name_proper}: {e}")
-
-    # Try to get Spotify data as supplement if available
-    if SPOTIFY_ENABLED:
-        try:
-            results = sp.search(q=artist_name, type='artist', limit=1)
-            if results['artists']['items']:
-                artist_obj = results['artists']['items'][0]
-                spotify_url = artist_obj['external_urls']['spotify']
-
-                # Use Spotify image if Wikipedia didn't provide one
-                if not image_url and artist_obj['images']:
-                    image_url = artist_obj['images'][0]['url']
-        except Exception as e:
-            print(f"Spotify API error: {e}")
-
-    # If Spotify isn't available, try to construct Spotify URL from iTunes Search API
-    if not spotify_url:
-        try:
-            from urllib.parse import quote
-
-            # Try iTunes Search API which sometimes has Spotify artist IDs or links
-            itunes_url = f"https://itunes.apple.com/search?term={quote(artist_name_proper)}&entity=allArtist&limit=1"
-            itunes_response = requests.get(itunes_url, timeout=10, headers={'User-Agent': 'BillboardAnalyzer/1.0'})
-
-            if itunes_response.status_code == 200:
-                itunes_data = itunes_response.json()
-                if itunes_data.get('results') and len(itunes_data['results']) > 0:
-                    artist_result = itunes_data['results'][0]
+    # Image, Wikipedia overview and Spotify link (cached across workers)
+    metadata, _ = artwork.get_artist_metadata(artist_name_proper, artwork.spotify_client())
+    image_url = metadata['image_url']
+    spotify_url = metadata['spotify_url']
+    overview = metadata['overview'] or description  # Billboard description as fallback
 
-                    # Get artist name from iTunes for potential Spotify search
-                    itunes_artist_name = artist_result.get('artistName', artist_name_proper)
-
-                    # Try to construct Spotify search URL (opens Spotify with search)
-                    # Format: https://open.spotify.com/search/{artist_name}
-                    search_query = quote(itunes_artist_name)
-                    spotify_url = f"https://open.spotify.com/search/{search_query}"
-                    print(f"✓ Created Spotify search URL: {spotify_url}")
-        except Exception as e:
-            print(f"iTunes/Spotify URL construction error: {e}")
-
-    return jsonify({
+    return {
         'name': artist_name_proper,
         'image_url': image_url,
+        'image_urls': image_proxy.proxy_urls(image_url),
         'spotify_url': spotify_url,
         'overview': overview,
         'stats': {
@@ -470,424 +381,398 @@ def get_artist_info(artist_name):
             'number_ones': number_ones,
             'top_10_hits': top_10_hits
         }
-    })
+    }
 
-@app.route('/api/song-image/<path:artist_name>/<path:song_name>')
-def get_song_image(artist_name, song_name):
-    """API endpoint to get song/album artwork from iTunes API (path: allows slashes in names)"""
+@main.route('/api/artist-info/<artist_name>')
+def get_artist_info(artist_name):
+    """API endpoint for artist information from Spotify (image) + Wikipedia/Billboard overview"""
 
+    # Get Billboard data for statistics (?from=&to= limits them to an era)
+    chart = get_chart('hot100')
     try:
-        import requests
-        from urllib.parse import quote
-
-        # iTunes API search
-        query = f"{song_name} {artist_name}"
-        itunes_url = f"https://itunes.apple.com/search?term={quote(query)}&media=music&entity=song&limit=3"
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-
-        response = requests.get(itunes_url, timeout=5, headers=headers)
-
-        if response.status_code == 200 and response.text:
-            try:
-                data = response.json()
-
-                if data.get('resultCount', 0) > 0:
-                    result = data['results'][0]
-                    # Get high-res artwork (replace 100x100 with 600x600)
-                    artwork_url = result.get('artworkUrl100', '').replace('100x100', '600x600')
-
-                    if artwork_url:
-                        return jsonify({
-                            'image_url': artwork_url,
-                            'album_name': result.get('collectionName', ''),
-                            'track_name': result.get('trackName', ''),
-                            'source': 'itunes'
-                        })
-            except ValueError as json_error:
-                print(f"iTunes JSON parse error for '{song_name}' by {artist_name}: {json_error}")
+        first, stop = era_weeks(chart)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid from or to date'}), 400
+
+    # Cached per dataset version; simultaneous requests share one computation
+    info = payload_cache.cached('artist-info', chart, (artist_name.strip().lower(), first, stop),
+                                lambda: artist_info(chart, artist_name, first, stop))
+    if info is None:
+        return jsonify({'error': 'Artist not found in Billboard data'}), 404
+    return jsonify(info)
 
-        return jsonify({'error': 'Track not found'}), 404
+def artwork_response(kind, artist_name, name):
+    """Cached iTunes artwork lookup as a JSON response"""
+    try:
+        payload, _ = artwork.get_artwork(kind, artist_name, name)
+        if payload is None:
+            return jsonify({'error': 'Track not found' if kind == artwork.KIND_SONG else 'Album not found'}), 404
+        return jsonify(dict(payload, image_urls=image_proxy.proxy_urls(payload['image_url'])))
 
     except Exception as e:
-        print(f"iTunes API error for '{song_name}' by {artist_name}: {e}")
+        print(f"iTunes API error for {kind} '{name}' by {artist_name}: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/album-image/<path:artist_name>/<path:album_name>')
+@main.route('/api/song-image/<path:artist_name>/<path:song_name>')
+def get_song_image(artist_name, song_name):
+    """API endpoint to get song/album artwork from iTunes API (path: allows slashes in names)"""
+    return artwork_response(artwork.KIND_SONG, artist_name, song_name)
+
+@main.route('/api/album-image/<path:artist_name>/<path:album_name>')
 def get_album_image(artist_name, album_name):
     """API endpoint to get album artwork from iTunes API (path: allows slashes in names)"""
-
+    return artwork_response(artwork.KIND_ALBUM, artist_name, album_name)
+
+@main.route('/assets/<path:filename>')
+@limiter.exempt
+def serve_asset(filename):
+    """Fingerprinted static file, precompressed and cached for a year"""
+    return assets.send_asset(filename)
+
+@main.route('/img/<int:size>/<token>')
+@limiter.exempt
+def proxy_image(size, token):
+    """Resized artwork served from the local image cache"""
+    if size not in image_proxy.IMAGE_SIZES:
+        return jsonify({'error': 'Unsupported size'}), 404
     try:
-        import requests
-        from urllib.parse import quote
-
-        # iTunes API search for albums
-        query = f"{album_name} {artist_name}"
-        itunes_url = f"https://itunes.apple.com/search?term={quote(query)}&media=music&entity=album&limit=3"
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-
-        response = requests.get(itunes_url, timeout=5, headers=headers)
-
-        if response.status_code == 200 and response.text:
-            try:
-                data = response.json()
-
-                if data.get('resultCount', 0) > 0:
-                    result = data['results'][0]
-                    # Get high-res artwork (replace 100x100 with 600x600)
-                    artwork_url = result.get('artworkUrl100', '').replace('100x100', '600x600')
-
-                    if artwork_url:
-                        return jsonify({
-                            'image_url': artwork_url,
-                            'album_name': result.get('collectionName', ''),
-                            'artist_name': result.get('artistName', ''),
-                            'source': 'itunes'
-                        })
-            except ValueError as json_error:
-                print(f"iTunes JSON parse error for album '{album_name}' by {artist_name}: {json_error}")
-
-        return jsonify({'error': 'Album not found'}), 404
+        url = image_proxy.decode_url(token)
+    except ValueError:
+        return jsonify({'error': 'Invalid image token'}), 404
+    if not image_proxy.is_allowed(url):
+        return jsonify({'error': 'Image host not allowed'}), 404
 
+    try:
+        data = image_proxy.get_image(url, size)
     except Exception as e:
-        print(f"iTunes API error for album '{album_name}' by {artist_name}: {e}")
-        return jsonify({'error': str(e)}), 500
+        print(f"Image proxy error for {url}: {e}")
+        return jsonify({'error': 'Could not fetch image'}), 502
+
+    # Token and size fully determine the bytes, so browsers can keep them forever
+    response = current_app.response_class(data, mimetype=image_proxy.sniff_mimetype(data))
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.add_etag()
+    return response.make_conditional(request)
+
+def render_chart(chart_key):
+    """Render the weekly chart viewer for any registered chart"""
+    chart = CHARTS[chart_key]
+    if not chart.available:
+        flash(f'{chart.title} data is not available', 'error')
+        return redirect(url_for('main.index'))
+    chart.load()
 
-@app.route('/hot100')
-def hot100():
-    """Hot 100 Weekly Chart Viewer"""
     # Get the selected date from query params (default to latest)
     selected_date = request.args.get('date', None)
 
-    # Get unique dates from 1958-2025 (entire Billboard Hot 100 history), sorted descending
-    data = BILLBOARD_DATA.copy()
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data = data.dropna(subset=['Date'])
-
-    # Filter for 1958-2025 dates (complete Hot 100 history)
-    dates_filtered = data[(data['Date'].dt.year >= 1958) & (data['Date'].dt.year <= 2025)]['Date'].unique()
-    dates_filtered = sorted(dates_filtered, reverse=True)
-
-    # Convert to string format for display
-    available_dates = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates_filtered]
+    # All chart weeks, newest first
+    available_dates = chart.week_strings()
 
     # If no date selected, use the latest
     if not selected_date and available_dates:
         selected_date = available_dates[0]
 
-    # Get chart data for selected date
+    # Get chart data for selected date (any date snaps to its chart week)
     chart_songs = []
     if selected_date:
-        date_data = data[data['Date'] == pd.to_datetime(selected_date)]
-        date_data = date_data.sort_values('Rank')
-
-        selected_date_dt = pd.to_datetime(selected_date)
-
-        # PRE-CALCULATE cumulative weeks for all songs on this chart (PERFORMANCE OPTIMIZATION)
-        # Filter data up to selected date once
-        historical_data = data[data['Date'] <= selected_date_dt].copy()
-        historical_data['Song_Clean'] = historical_data['Song'].str.strip()
-        historical_data['Artist_Clean'] = historical_data['Artist'].str.strip()
-
-        # Group by song+artist and count appearances
-        weeks_lookup = historical_data.groupby(['Song_Clean', 'Artist_Clean']).size().to_dict()
-
-        for _, row in date_data.iterrows():
-            # Helper function to safely convert to int
-            def safe_int(val, default=None):
-                if pd.isna(val):
-                    return default
-                if isinstance(val, str) and (val.strip() == '-' or val.strip() == ''):
-                    return default
-                try:
-                    result = int(float(val))
-                    return result if result != 0 else default
-                except (ValueError, TypeError):
-                    return default
-
-            # Get song info
-            song_name = row['Song'].strip() if pd.notna(row['Song']) else ''
-            artist_name = row['Artist'].strip() if pd.notna(row['Artist']) else ''
-
-            # Lookup cumulative weeks from pre-calculated dictionary
-            cumulative_weeks = weeks_lookup.get((song_name, artist_name), 1)
-
-            song_info = {
-                'rank': int(row['Rank']),
-                'song': song_name,
-                'artist': artist_name,
-                'last_week': safe_int(row['Last Week']),
-                'peak': safe_int(row['Peak Position'], int(row['Rank'])),
-                'weeks': cumulative_weeks,
-            }
-
-            # Calculate position change
-            if song_info['last_week'] is None:
-                song_info['change'] = 'new'
-                song_info['change_amount'] = 0
-            elif song_info['rank'] < song_info['last_week']:
-                song_info['change'] = 'up'
-                song_info['change_amount'] = song_info['last_week'] - song_info['rank']
-            elif song_info['rank'] > song_info['last_week']:
-                song_info['change'] = 'down'
-                song_info['change_amount'] = song_info['rank'] - song_info['last_week']
-            else:
-                song_info['change'] = 'same'
-                song_info['change_amount'] = 0
-
-            chart_songs.append(song_info)
+        try:
+            selected_date = chart.week_date(chart.snap_week(selected_date))
+            chart_songs = payload_cache.cached('chart-week', chart, (selected_date,),
+                                               lambda: chart.week_entries(selected_date))
+        except (ValueError, TypeError):
+            flash(f'Invalid chart date: {selected_date}', 'error')
 
     return render_template(
-        'hot100.html',
+        chart.definition['template'],
         available_dates=available_dates,
         selected_date=selected_date,
         chart_songs=chart_songs
     )
 
-@app.route('/billboard200')
+@main.route('/hot100')
+def hot100():
+    """Hot 100 Weekly Chart Viewer"""
+    return render_chart('hot100')
+
+@main.route('/billboard200')
 def billboard200():
     """Billboard 200 Weekly Albums Chart Viewer"""
-    if BILLBOARD_200_DATA is None:
-        flash('Billboard 200 data is not available', 'error')
-        return redirect(url_for('index'))
+    return render_chart('billboard200')
+
+@main.route('/charts/<chart_key>')
+def chart_view(chart_key):
+    """Weekly viewer for any chart in the registry"""
+    if chart_key not in CHARTS:
+        flash(f'Unknown chart: {chart_key}', 'error')
+        return redirect(url_for('main.index'))
+    return render_chart(chart_key)
+
+# Longest range /api/chart-range will return in one response
+MAX_RANGE_WEEKS = 53 * 5
+
+@main.route('/api/chart-range')
+def get_chart_range():
+    """All chart weeks between two dates (?chart=&start=&end=)"""
+    chart_key = request.args.get('chart', 'hot100')
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
+
+    start = request.args.get('start', '')
+    end = request.args.get('end', '') or start
+    if not start:
+        return jsonify({'error': 'Missing start parameter'}), 400
 
-    # Get the selected date from query params (default to latest)
-    selected_date = request.args.get('date', None)
-
-    # Get unique dates from Billboard 200 data
-    data = BILLBOARD_200_DATA.copy()
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data = data.dropna(subset=['Date'])
-
-    # Filter for dates (entire Billboard 200 history)
-    dates_filtered = data[(data['Date'].dt.year >= 1963) & (data['Date'].dt.year <= 2025)]['Date'].unique()
-    dates_filtered = sorted(dates_filtered, reverse=True)
-
-    # Convert to string format for display
-    available_dates = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates_filtered]
-
-    # If no date selected, use the latest
-    if not selected_date and available_dates:
-        selected_date = available_dates[0]
-
-    # Get chart data for selected date
-    chart_songs = []
-    if selected_date:
-        date_data = data[data['Date'] == pd.to_datetime(selected_date)]
-        date_data = date_data.sort_values('Rank')
-
-        selected_date_dt = pd.to_datetime(selected_date)
-
-        # PRE-CALCULATE cumulative weeks for all albums on this chart
-        historical_data = data[data['Date'] <= selected_date_dt].copy()
-        historical_data['Song_Clean'] = historical_data['Song'].str.strip()
-        historical_data['Artist_Clean'] = historical_data['Artist'].str.strip()
-
-        # Group by album+artist and count appearances
-        weeks_lookup = historical_data.groupby(['Song_Clean', 'Artist_Clean']).size().to_dict()
-
-        for _, row in date_data.iterrows():
-            # Helper function to safely convert to int
-            def safe_int(val, default=None):
-                if pd.isna(val):
-                    return default
-                if isinstance(val, str) and (val.strip() == '-' or val.strip() == ''):
-                    return default
-                try:
-                    result = int(float(val))
-                    return result if result != 0 else default
-                except (ValueError, TypeError):
-                    return default
-
-            # Get album info
-            song_name = row['Song'].strip() if pd.notna(row['Song']) else ''
-            artist_name = row['Artist'].strip() if pd.notna(row['Artist']) else ''
-
-            # Lookup cumulative weeks from pre-calculated dictionary
-            cumulative_weeks = weeks_lookup.get((song_name, artist_name), 1)
-
-            song_info = {
-                'rank': int(row['Rank']),
-                'song': song_name,
-                'artist': artist_name,
-                'last_week': safe_int(row['Last Week']),
-                'peak': safe_int(row['Peak Position'], int(row['Rank'])),
-                'weeks': cumulative_weeks,
+    try:
+        first, stop = chart.load().week_range(start, end)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid start or end date'}), 400
+
+    if stop - first > MAX_RANGE_WEEKS:
+        return jsonify({'error': f'Range too large (max {MAX_RANGE_WEEKS} weeks)'}), 400
+
+    return jsonify(payload_cache.cached('chart-range', chart, (first, stop), lambda: {
+        'chart': chart_key,
+        'start': chart.week_date(first),
+        'end': chart.week_date(stop - 1),
+        'weeks': chart.range_entries(first, stop)
+    }))
+
+@main.route('/api/cache-stats')
+@limiter.exempt
+def get_cache_stats():
+    """Payload cache hit ratios per route and request coalescing counts (this worker)"""
+    return jsonify(dict(payload_cache.stats(), singleflight=singleflight.stats()))
+
+@main.route('/api/leaderboards/<chart_key>')
+def get_chart_leaderboards(chart_key):
+    """Precomputed all-time leaderboards (?board= for one, ?limit= to trim)"""
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
+
+    board = request.args.get('board')
+    if board and board not in BOARDS:
+        return jsonify({'error': f'Unknown board: {board}'}), 400
+    limit = max(1, min(request.args.get('limit', leaderboards.LEADERBOARD_SIZE, type=int),
+                       leaderboards.LEADERBOARD_SIZE))
+
+    boards = get_leaderboards(chart)
+    names = [board] if board else list(BOARDS)
+    return jsonify({
+        'chart': chart_key,
+        'boards': {
+            name: {
+                'title': BOARDS[name],
+                'entries': boards.board(name)[:limit]
             }
+            for name in names
+        }
+    })
 
-            # Calculate position change
-            if song_info['last_week'] is None:
-                song_info['change'] = 'new'
-                song_info['change_amount'] = 0
-            elif song_info['rank'] < song_info['last_week']:
-                song_info['change'] = 'up'
-                song_info['change_amount'] = song_info['last_week'] - song_info['rank']
-            elif song_info['rank'] > song_info['last_week']:
-                song_info['change'] = 'down'
-                song_info['change_amount'] = song_info['rank'] - song_info['last_week']
-            else:
-                song_info['change'] = 'same'
-                song_info['change_amount'] = 0
-
-            chart_songs.append(song_info)
-
-    return render_template(
-        'billboard200.html',
-        available_dates=available_dates,
-        selected_date=selected_date,
-        chart_songs=chart_songs
-    )
-
-@app.route('/api/song-history')
-def get_song_history():
-    """Get full chart history for a specific song (using query parameters to support slashes in names)"""
-    artist = request.args.get('artist', '')
-    song = request.args.get('song', '')
-
-    if not artist or not song:
-        return jsonify({'error': 'Missing artist or song parameter'}), 400
-
-    data = BILLBOARD_DATA.copy()
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data = data.dropna(subset=['Date'])
-
-    # Clean and filter
-    data['Song_Clean'] = data['Song'].str.strip().str.lower()
-    data['Artist_Clean'] = data['Artist'].str.strip().str.lower()
-
-    song_data = data[
-        (data['Song_Clean'] == song.lower()) &
-        (data['Artist_Clean'] == artist.lower())
-    ].copy()
+@main.route('/api/movers/<chart_key>/<date>')
+def get_chart_movers(chart_key, date):
+    """Debuts, re-entries, biggest gains/drops and exits for a chart week (?limit=)"""
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
 
-    if song_data.empty:
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    try:
+        pos = chart.load().snap_week(date)
+    except (ValueError, TypeError):
+        return jsonify({'error': f'Invalid chart date: {date}'}), 400
+
+    result = movers.get_movers(chart).week_movers(pos, limit)
+    result['chart'] = chart_key
+    result['date'] = chart.week_date(pos)
+    return jsonify(result)
+
+@main.route('/api/chart-diff/<chart_key>')
+def get_chart_diff(chart_key):
+    """Entries added, dropped and moved between two chart weeks (?a=&b=, b defaults to latest)"""
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
+
+    a = request.args.get('a', '')
+    if not a:
+        return jsonify({'error': 'Missing a parameter'}), 400
+
+    started = time.time()
+    try:
+        chart.load()
+        pos_a = chart.snap_week(a)
+        b = request.args.get('b', '')
+        pos_b = chart.snap_week(b) if b else len(chart.weeks) - 1
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid a or b date'}), 400
+
+    result = chart.week_diff(pos_a, pos_b)
+    result['chart'] = chart_key
+    result['a'] = chart.week_date(pos_a)
+    result['b'] = chart.week_date(pos_b)
+    result['took_ms'] = round((time.time() - started) * 1000, 2)
+    return jsonify(result)
+
+def chart_history_response(chart_key, item, artist):
+    """Full chart history for one song/album as a JSON response"""
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
+
+    label = chart.item_label
+    if not artist or not item:
+        return jsonify({'error': f'Missing artist or {label} parameter'}), 400
+
+    result = payload_cache.cached('chart-history', chart, (item.strip().lower(), artist.strip().lower()),
+                                  lambda: chart.entry_history(item, artist))
+    if result is None:
         return jsonify({'error': 'No history found'}), 404
 
-    # Sort by date
-    song_data = song_data.sort_values('Date')
-
-    # Helper function to safely convert to int
-    def safe_int(val, default=None):
-        if pd.isna(val):
-            return default
-        if isinstance(val, str) and (val.strip() == '-' or val.strip() == ''):
-            return default
-        try:
-            result = int(float(val))
-            return result if result != 0 else default
-        except (ValueError, TypeError):
-            return default
-
-    history = []
-    for idx, (_, row) in enumerate(song_data.iterrows(), start=1):
-        # Cumulative weeks = index position (starting from 1)
-        history.append({
-            'date': row['Date'].strftime('%Y-%m-%d'),
-            'rank': int(row['Rank']),
-            'weeks': idx
-        })
-
-    # Get stats
-    peak = int(song_data['Rank'].min())
-    total_weeks = len(song_data)
+    return jsonify(dict(result, **{label: item, 'artist': artist}))
 
-    return jsonify({
-        'history': history,
-        'peak': peak,
-        'total_weeks': total_weeks,
-        'song': song,
-        'artist': artist
-    })
+@main.route('/api/song-history')
+def get_song_history():
+    """Get full chart history for a specific song (using query parameters to support slashes in names)"""
+    return chart_history_response('hot100', request.args.get('song', ''), request.args.get('artist', ''))
 
-@app.route('/api/album-history')
+@main.route('/api/album-history')
 def get_album_history():
     """Get full chart history for a specific album (using query parameters to support slashes in names)"""
-    if BILLBOARD_200_DATA is None:
-        return jsonify({'error': 'Billboard 200 data not available'}), 404
-
-    artist = request.args.get('artist', '')
-    album = request.args.get('album', '')
-
-    if not artist or not album:
-        return jsonify({'error': 'Missing artist or album parameter'}), 400
-
-    data = BILLBOARD_200_DATA.copy()
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data = data.dropna(subset=['Date'])
-
-    # Clean and filter (Song column contains album names in Billboard 200 data)
-    data['Album_Clean'] = data['Song'].str.strip().str.lower()
-    data['Artist_Clean'] = data['Artist'].str.strip().str.lower()
+    return chart_history_response('billboard200', request.args.get('album', ''), request.args.get('artist', ''))
+
+@main.route('/api/chart-history/<chart_key>')
+def get_chart_history(chart_key):
+    """Get full chart history for an entry on any registered chart"""
+    return chart_history_response(chart_key, request.args.get('item', ''), request.args.get('artist', ''))
+
+@main.route('/api/export')
+def stream_export():
+    """Raw chart rows as a streamed NDJSON or CSV download
+
+    ?chart=hot100&artist=&from=&to=&format=ndjson|csv; gzip-encoded when the
+    client accepts it. Rows are formatted in batches as they are sent.
+    """
+    chart_key = request.args.get('chart', 'hot100')
+    chart = CHARTS.get(chart_key)
+    if chart is None or not chart.available:
+        return jsonify({'error': 'Chart data not available'}), 404
+    # Week positions and credit codes below must match the rows streamed
+    chart = chart.load().snapshot()
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in exports.STREAM_MIMETYPES:
+        return jsonify({'error': f'Unknown format: {export_format}'}), 400
 
-    album_data = data[
-        (data['Album_Clean'] == album.lower()) &
-        (data['Artist_Clean'] == artist.lower())
-    ].copy()
-
-    if album_data.empty:
-        return jsonify({'error': 'No history found'}), 404
-
-    # Sort by date
-    album_data = album_data.sort_values('Date')
-
-    # Helper function to safely convert to int
-    def safe_int(val, default=None):
-        if pd.isna(val):
-            return default
-        if isinstance(val, str) and (val.strip() == '-' or val.strip() == ''):
-            return default
-        try:
-            result = int(float(val))
-            return result if result != 0 else default
-        except (ValueError, TypeError):
-            return default
-
-    history = []
-    for idx, (_, row) in enumerate(album_data.iterrows(), start=1):
-        # Cumulative weeks = index position (starting from 1)
-        history.append({
-            'date': row['Date'].strftime('%Y-%m-%d'),
-            'rank': int(row['Rank']),
-            'weeks': idx
-        })
-
-    # Get stats
-    peak = int(album_data['Rank'].min())
-    total_weeks = len(album_data)
-
-    return jsonify({
-        'history': history,
-        'peak': peak,
-        'total_weeks': total_weeks,
-        'album': album,
-        'artist': artist
-    })
-
-@app.route('/download/<artist_name>')
+    try:
+        first, stop = era_weeks(chart)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid from or to date'}), 400
+
+    artist = request.args.get('artist', '').strip()
+    codes = chart.artist_codes(artist) if artist else None
+    chunks = exports.stream_rows(chart, export_format, first, stop, codes)
+
+    response = current_app.response_class(chunks, mimetype=exports.STREAM_MIMETYPES[export_format])
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.response = exports.gzip_chunks(chunks)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    name = '_'.join(filter(None, [chart_key, re.sub(r'\W+', '_', artist, flags=re.ASCII).strip('_')]))
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+    return response
+
+# Seconds browsers wait before re-requesting a download that isn't ready yet
+DOWNLOAD_RETRY_SECONDS = 2
+# Longest a single export status poll is held open (?wait=). Off by default:
+# with sync gunicorn workers a held poll blocks a whole worker, so only raise
+# it when running threaded or async workers
+MAX_EXPORT_WAIT = float(os.environ.get('EXPORT_MAX_WAIT_SECONDS', '0'))
+
+def export_job_response(job):
+    """Public view of an export job"""
+    payload = {
+        'job_id': job['id'],
+        'type': job['type'],
+        'status': job['status'],
+        'error': job.get('error'),
+        'status_url': url_for('main.get_export_job', job_id=job['id']),
+    }
+    if job['status'] == exports.DONE:
+        payload['download_url'] = url_for('main.download_export', job_id=job['id'])
+    return payload
+
+@main.route('/api/exports', methods=['POST'])
+def submit_export():
+    """Queue an export job (type=artist|artists|year); returns its job ID
+
+    artist: artist=<name>; artists: artists=[...] (ZIP of workbooks);
+    year: chart=<key>, year=<YYYY>, format=csv|xlsx
+    """
+    params = request.get_json(silent=True)
+    if params is None:
+        params = request.form.to_dict()
+    if not isinstance(params, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    if 'artists' not in params and request.form.getlist('artists'):
+        params['artists'] = request.form.getlist('artists')
+    try:
+        job = exports.submit(params.get('type', 'artist'), params)
+    except exports.ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except exports.QueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify(export_job_response(job)), 202
+
+@main.route('/api/exports/<job_id>')
+@limiter.exempt
+def get_export_job(job_id):
+    """Export job status (?wait=N holds the request up to N seconds until it finishes)"""
+    wait = min(request.args.get('wait', 0, type=float), MAX_EXPORT_WAIT)
+    job = exports.wait(job_id, wait) if wait > 0 else exports.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify(export_job_response(job))
+
+@main.route('/api/exports/<job_id>/download')
+@limiter.exempt
+def download_export(job_id):
+    """File produced by a finished export job"""
+    job = exports.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    browser = request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'text/html'
+    if job['status'] in (exports.QUEUED, exports.RUNNING):
+        # Still building: API clients get the job and Retry-After; a browser
+        # that followed /download/<artist_name> here gets a page that reloads
+        # this URL until the file is served
+        if browser:
+            label = job['params'].get('artist') or 'Your export'
+            response = current_app.make_response(
+                render_template('export.html', label=label, retry_seconds=DOWNLOAD_RETRY_SECONDS))
+        else:
+            response = jsonify(export_job_response(job))
+        response.status_code = 202
+        response.headers['Retry-After'] = str(DOWNLOAD_RETRY_SECONDS)
+        return response
+    if job['status'] != exports.DONE:
+        if browser:
+            flash(job.get('error') or 'Export failed', 'error')
+            return redirect(url_for('main.index'))
+        return jsonify(export_job_response(job)), 409
+    return send_file(exports.output_path(job), as_attachment=True, download_name=job['filename'])
+
+@main.route('/download/<artist_name>')
 def download_excel(artist_name):
-    """Download Excel file for artist"""
+    """Download Excel file for artist: queues the export and redirects to its
+    download URL, which shows a "preparing" page until the job has finished"""
     try:
-        output_file, error = process_billboard_data(artist_name)
-
-        if error:
-            flash(error, 'error')
-            return redirect(url_for('index'))
-
-        return send_file(
-            output_file,
-            as_attachment=True,
-            download_name=f'{artist_name.replace(" ", "_")}_Chart_History.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-
-    except Exception as e:
-        flash(f'An error occurred: {str(e)}', 'error')
-        return redirect(url_for('index'))
+        job = exports.submit('artist', {'artist': artist_name})
+    except (exports.ExportError, exports.QueueFull) as e:
+        flash(str(e), 'error')
+        return redirect(url_for('main.index'))
+    return redirect(url_for('main.download_export', job_id=job['id']), 303)
 
 if __name__ == '__main__':
     print("\n" + "="*60)
@@ -899,4 +784,4 @@ if __name__ == '__main__':
     print(f"Open your browser and go to: http://localhost:{port}")
     print("\nPress CTRL+C to stop the server")
     print("="*60 + "\n")
-    app.run(debug=debug_mode, host='0.0.0.0', port=port)
+    create_app().run(debug=debug_mode, host='0.0.0.0', port=port)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Artist Song Lists
+Per-artist song summaries with every supported sort order computed once, so
+the results page and /api/artist/<name>/songs can serve any page by slicing
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import singleflight
+
+# How many artist indexes to keep (LRU); cleared whenever the chart reloads
+CACHE_SIZE = 256
+
+DEFAULT_SORT = 'default'
+SORTS = ('default', 'peak', 'weeks', 'debut')
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _most_common(values):
+    """Most frequent spelling (ties go to the first alphabetically)"""
+    modes = values.mode()
+    return modes.iloc[0] if len(modes) > 0 else values.iloc[0]
+
+
+class ArtistSongs:
+    """Songs credited to an artist, with one precomputed order per sort
+
+    rows are the artist's chart rows; row_song[i] is the song index of each row.
+    Songs are numbered by first appearance, which is also debut order.
+    """
+
+    def __init__(self, chart, name, first=0, stop=None):
+        # Substring match on artist credits, then slice each credit's rows to the era
+        codes = chart.artist_codes(name)
+        rows = chart.data.iloc[chart.artist_rows(codes, first, stop)]
+        self.rows = rows
+
+        if rows.empty:
+            self.artist = None
+            self.songs = []
+            self.orders = {sort: np.zeros(0, dtype=np.int64) for sort in SORTS}
+            self.row_song = np.zeros(0, dtype=np.int64)
+            return
+
+        song_lower = rows['Song_Lower'].astype(str)
+        self.row_song, keys = pd.factorize(song_lower)
+        self.artist = _most_common(rows['Artist'].astype(str))
+        titles = rows['Song'].astype(str).groupby(self.row_song).agg(_most_common)
+
+        positions = np.arange(len(rows))
+        n = len(keys)
+        peak = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+        np.minimum.at(peak, self.row_song, rows['Rank'].to_numpy().astype(np.int32))
+        weeks = np.bincount(self.row_song, minlength=n)
+        first_row = np.full(n, len(rows), dtype=np.int64)
+        np.minimum.at(first_row, self.row_song, positions)
+        debut = rows['Date'].to_numpy()[first_row]
+
+        self.songs = []
+        for i in range(n):
+            date = pd.Timestamp(debut[i])
+            self.songs.append({
+                'name': f"{titles[i]} ({self.artist})",
+                'song_only': titles[i],
+                'artist_only': self.artist,
+                'peak': int(peak[i]),
+                'weeks': int(weeks[i]),
+                'first_date': date.strftime('%b %Y'),
+                'debut': date.strftime('%Y-%m-%d'),
+                'is_number_one': bool(peak[i] == 1),
+            })
+
+        # Rows are in (date, rank) order, so first_row breaks every tie by debut
+        self.orders = {
+            'default': np.lexsort((first_row, peak != 1)),     # #1s first, then by debut
+            'peak': np.lexsort((first_row, -weeks, peak)),
+            'weeks': np.lexsort((first_row, peak, -weeks)),
+            'debut': np.argsort(first_row, kind='stable'),
+        }
+
+    @property
+    def total(self):
+        return len(self.songs)
+
+    def page(self, sort=DEFAULT_SORT, page=1, size=PAGE_SIZE):
+        """Songs on a 1-based page of the given sort order"""
+        order = self.orders[sort]
+        start = (page - 1) * size
+        return [self.songs[i] for i in order[start:start + size]]
+
+    def stats(self):
+        return {
+            'total_songs': self.total,
+            'top_10_hits': sum(1 for s in self.songs if s['peak'] <= 10),
+            'number_ones': sum(1 for s in self.songs if s['is_number_one']),
+        }
+
+    def chart_data(self):
+        """{song name: [{date, rank}, ...]} in debut order, for the results chart"""
+        dates = self.rows['Date'].dt.strftime('%Y-%m-%d').to_numpy()
+        ranks = self.rows['Rank'].to_numpy()
+        order = np.argsort(self.row_song, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(self.row_song, minlength=self.total))]
+        return {
+            song['name']: [
+                {'date': dates[r], 'rank': int(ranks[r])}
+                for r in order[bounds[i]:bounds[i + 1]]
+            ]
+            for i, song in enumerate(self.songs)
+        }
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: cached song lists are stale after any change"""
+    with _lock:
+        for key in [k for k in _cache if k[0] == chart.key]:
+            del _cache[key]
+
+
+def track_charts(charts):
+    """Drop cached song lists whenever a chart loads or refreshes"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def get_artist_songs(chart, name, first=0, stop=None):
+    """Cached ArtistSongs for an artist search over weeks first..stop-1 of a loaded chart"""
+    # Pin one state so the key's version matches the data the index is built from
+    chart = chart.load().snapshot()
+    stop = len(chart.weeks) if stop is None else stop
+    key = (chart.key, chart.version, name.strip().lower(), first, stop)
+    with _lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+            return index
+
+    # Concurrent misses for the same artist build the index once
+    index = singleflight.do(('artist-songs',) + key,
+                            lambda: ArtistSongs(chart, name, first, stop))
+    with _lock:
+        _cache[key] = index
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Artwork & Artist Metadata
+iTunes/Wikipedia lookups backed by a persistent SQLite cache
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote, urlparse
+
+import requests
+
+import singleflight
+
+# Upstream APIs (overridable so tests and load tests can use local stubs)
+ITUNES_SEARCH_URL = os.environ.get('ITUNES_SEARCH_URL', 'https://itunes.apple.com/search')
+WIKIPEDIA_SUMMARY_URL = os.environ.get(
+    'WIKIPEDIA_SUMMARY_URL', 'https://en.wikipedia.org/api/rest_v1/page/summary/')
+
+# Persistent cache shared by all workers and the warm-up job
+CACHE_PATH = Path(os.environ.get('ARTWORK_CACHE_PATH', 'data/artwork_cache.sqlite3'))
+FOUND_TTL = int(os.environ.get('ARTWORK_CACHE_DAYS', '30')) * 86400
+MISSING_TTL = int(os.environ.get('ARTWORK_MISSING_DAYS', '3')) * 86400
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+KIND_SONG = 'song'
+KIND_ALBUM = 'album'
+KIND_ARTIST = 'artist'
+
+_local = threading.local()
+
+_spotify = None
+_spotify_checked = False
+
+
+def _connection():
+    """One SQLite connection per thread (WAL lets workers read while one writes)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS artwork (
+                kind TEXT NOT NULL,
+                artist TEXT NOT NULL,
+                name TEXT NOT NULL,
+                payload TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (kind, artist, name)
+            )
+        ''')
+        _local.conn = conn
+    return conn
+
+
+def _key(artist, name):
+    return artist.strip().lower(), name.strip().lower()
+
+
+def cache_get(kind, artist, name=''):
+    """(hit, payload) - payload is None for a cached "not found" """
+    artist, name = _key(artist, name)
+    row = _connection().execute(
+        'SELECT payload, fetched_at FROM artwork WHERE kind=? AND artist=? AND name=?',
+        (kind, artist, name)).fetchone()
+    if row is None:
+        return False, None
+    payload, fetched_at = row
+    ttl = FOUND_TTL if payload is not None else MISSING_TTL
+    if time.time() - fetched_at > ttl:
+        return False, None
+    return True, json.loads(payload) if payload is not None else None
+
+
+def cache_put(kind, artist, name, payload):
+    artist, name = _key(artist, name)
+    conn = _connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO artwork (kind, artist, name, payload, fetched_at) VALUES (?, ?, ?, ?, ?)',
+        (kind, artist, name, json.dumps(payload) if payload is not None else None, time.time()))
+    conn.commit()
+
+
+class HostRateLimiter:
+    """Per-host minimum interval between requests (thread-safe)"""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _get(url, limiter=None, **kwargs):
+    if limiter is not None:
+        limiter.wait(url)
+    return requests.get(url, **kwargs)
+
+
+def fetch_itunes_artwork(kind, artist_name, name, limiter=None):
+    """Look up song/album artwork on iTunes; returns a payload dict or None"""
+    entity = 'song' if kind == KIND_SONG else 'album'
+    query = f"{name} {artist_name}"
+    itunes_url = f"{ITUNES_SEARCH_URL}?term={quote(query)}&media=music&entity={entity}&limit=3"
+
+    response = _get(itunes_url, limiter, timeout=5, headers=BROWSER_HEADERS)
+    if response.status_code != 200 or not response.text:
+        return None
+
+    try:
+        data = response.json()
+    except ValueError as json_error:
+        print(f"iTunes JSON parse error for {kind} '{name}' by {artist_name}: {json_error}")
+        return None
+
+    if data.get('resultCount', 0) > 0:
+        result = data['results'][0]
+        # Get high-res artwork (replace 100x100 with 600x600)
+        artwork_url = result.get('artworkUrl100', '').replace('100x100', '600x600')
+        if artwork_url:
+            payload = {
+                'image_url': artwork_url,
+                'album_name': result.get('collectionName', ''),
+                'source': 'itunes'
+            }
+            if kind == KIND_SONG:
+                payload['track_name'] = result.get('trackName', '')
+            else:
+                payload['artist_name'] = result.get('artistName', '')
+            return payload
+    return None
+
+
+def get_artwork(kind, artist_name, name, limiter=None):
+    """Cached artwork lookup; returns (payload or None, cache_hit)
+
+    Network errors propagate and are not cached, so they are retried.
+    """
+    hit, payload = cache_get(kind, artist_name, name)
+    if hit:
+        return payload, True
+
+    def fetch():
+        payload = fetch_itunes_artwork(kind, artist_name, name, limiter)
+        cache_put(kind, artist_name, name, payload)
+        return payload
+
+    # Concurrent misses for the same artwork (in any worker) share one fetch
+    payload = singleflight.do((kind,) + _key(artist_name, name), fetch,
+                              lambda: cache_get(kind, artist_name, name), shared=True)
+    return payload, False
+
+
+def fetch_wikipedia_summary(artist_name, limiter=None):
+    """Image and two-sentence overview from Wikipedia; returns (image_url, overview)"""
+    image_url = None
+    overview = None
+
+    # Try multiple Wikipedia search variations for disambiguation
+    wiki_attempts = [
+        artist_name,  # Original name
+        f"{artist_name} (musician)",
+        f"{artist_name} (rapper)",
+        f"{artist_name} (singer)",
+        f"{artist_name} (band)"
+    ]
+
+    for attempt_name in wiki_attempts:
+        try:
+            wiki_url = f"{WIKIPEDIA_SUMMARY_URL}{quote(attempt_name)}"
+            response = _get(wiki_url, limiter, timeout=10,
+                            headers={'User-Agent': 'Mozilla/5.0 BillboardAnalyzer/1.0'})
+
+            if response.status_code == 200:
+                data = response.json()
+
+                # Check if this is a disambiguation page
+                if data.get('type', '') == 'disambiguation':
+                    print(f"✗ Disambiguation page for {attempt_name}, trying next...")
+                    continue
+
+                print(f"✓ Wikipedia page found for {attempt_name}")
+
+                # Get Wikipedia image (try multiple sources)
+                if 'originalimage' in data and data['originalimage'] and 'source' in data['originalimage']:
+                    image_url = data['originalimage']['source']
+                elif 'thumbnail' in data and data['thumbnail'] and 'source' in data['thumbnail']:
+                    # Use larger thumbnail - replace size in URL
+                    thumb_url = data['thumbnail']['source']
+                    image_url = thumb_url.replace('/50px-', '/600px-').replace('/100px-', '/600px-').replace('/200px-', '/600px-').replace('/300px-', '/600px-')
+
+                # Get Wikipedia description (first 2 sentences)
+                if 'extract' in data and data['extract']:
+                    sentences = data['extract'].split('. ')
+                    if len(sentences) >= 2:
+                        overview = '. '.join(sentences[:2]) + '.'
+                    else:
+                        overview = data['extract']
+
+                # Found valid page, stop trying
+                break
+
+        except Exception as inner_e:
+            print(f"✗ Error trying {attempt_name}: {inner_e}")
+            continue
+
+    return image_url, overview
+
+
+def fetch_itunes_spotify_url(artist_name, limiter=None):
+    """Spotify search URL for the artist's iTunes name, or None"""
+    itunes_url = f"{ITUNES_SEARCH_URL}?term={quote(artist_name)}&entity=allArtist&limit=1"
+    response = _get(itunes_url, limiter, timeout=10, headers={'User-Agent': 'BillboardAnalyzer/1.0'})
+
+    if response.status_code == 200:
+        itunes_data = response.json()
+        if itunes_data.get('results'):
+            # Use the iTunes artist name to build a Spotify search URL
+            itunes_artist_name = itunes_data['results'][0].get('artistName', artist_name)
+            return f"https://open.spotify.com/search/{quote(itunes_artist_name)}"
+    return None
+
+
+def spotify_client():
+    """Shared Spotify client, or None if credentials aren't configured
+
+    spotipy is imported on first call so importing this module stays cheap.
+    Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET in the environment.
+    """
+    global _spotify, _spotify_checked
+    if not _spotify_checked:
+        try:
+            import spotipy
+            from spotipy.oauth2 import SpotifyClientCredentials
+            _spotify = spotipy.Spotify(auth_manager=SpotifyClientCredentials())
+        except Exception as e:
+            print(f"⚠️  Spotify API not configured: {e}")
+        _spotify_checked = True
+    return _spotify
+
+
+def get_artist_metadata(artist_name, spotify=None, limiter=None):
+    """Cached artist image, Wikipedia overview and Spotify URL; returns (payload, cache_hit)"""
+    hit, payload = cache_get(KIND_ARTIST, artist_name)
+    if hit and payload is not None:
+        return payload, True
+
+    def lookup():
+        hit, payload = cache_get(KIND_ARTIST, artist_name)
+        return hit and payload is not None, payload
+
+    payload = singleflight.do((KIND_ARTIST,) + _key(artist_name, ''),
+                              lambda: _fetch_artist_metadata(artist_name, spotify, limiter),
+                              lookup, shared=True)
+    return payload, False
+
+
+def _fetch_artist_metadata(artist_name, spotify=None, limiter=None):
+    """Look up and cache artist metadata (see get_artist_metadata)"""
+    image_url, overview = fetch_wikipedia_summary(artist_name, limiter)
+    spotify_url = None
+
+    # Try to get Spotify data as supplement if available
+    if spotify is not None:
+        try:
+            results = spotify.search(q=artist_name, type='artist', limit=1)
+            if results['artists']['items']:
+                artist_obj = results['artists']['items'][0]
+                spotify_url = artist_obj['external_urls']['spotify']
+
+                # Use Spotify image if Wikipedia didn't provide one
+                if not image_url and artist_obj['images']:
+                    image_url = artist_obj['images'][0]['url']
+        except Exception as e:
+            print(f"Spotify API error: {e}")
+
+    # If Spotify isn't available, construct a Spotify search URL via iTunes
+    if not spotify_url:
+        try:
+            spotify_url = fetch_itunes_spotify_url(artist_name, limiter)
+        except Exception as e:
+            print(f"iTunes/Spotify URL construction error: {e}")
+
+    payload = {'image_url': image_url, 'spotify_url': spotify_url, 'overview': overview}
+    # Nothing at all usually means the upstreams were unreachable - retry later
+    if image_url or spotify_url or overview:
+        cache_put(KIND_ARTIST, artist_name, '', payload)
+    return payload
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Static Assets
+Serves the fingerprinted, precompressed files written by build_assets.py.
+
+Templates call asset_url('style.css') / font_src('fonts/...otf'). After a build
+these point at /assets/<name>.<hash>.<ext>, which is cached forever by browsers
+(the name changes whenever the content does). Without a build they fall back
+to the plain /static/ files, so development needs no extra step.
+"""
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from flask import request, send_from_directory, url_for
+from markupsafe import Markup
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+DIST_DIR = STATIC_DIR / 'dist'
+MANIFEST_PATH = DIST_DIR / 'manifest.json'
+
+# Precompressed variants, best first: (file suffix, Content-Encoding)
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_manifest = None
+_manifest_mtime = None
+
+
+def manifest():
+    """{source name: fingerprinted name}, reloaded when the build output changes"""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime
+    except OSError:
+        _manifest, _manifest_mtime = {}, None
+        return _manifest
+    if mtime != _manifest_mtime:
+        with open(MANIFEST_PATH) as f:
+            _manifest = json.load(f)
+        _manifest_mtime = mtime
+    return _manifest
+
+
+def asset_url(filename):
+    """URL for a file under static/ - fingerprinted if it has been built"""
+    built = manifest().get(filename)
+    if built is None:
+        return url_for('static', filename=filename)
+    return url_for('main.serve_asset', filename=built)
+
+
+def font_src(filename):
+    """@font-face src list: the WOFF2 build (if any) first, then the original font"""
+    sources = []
+    woff2 = os.path.splitext(filename)[0] + '.woff2'
+    if woff2 in manifest():
+        sources.append(f"url('{asset_url(woff2)}') format('woff2')")
+    sources.append(f"url('{asset_url(filename)}') format('opentype')")
+    return Markup(', '.join(sources))
+
+
+def send_asset(filename):
+    """Response for a built asset, precompressed when the client accepts it"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.headers.get('Accept-Encoding', '')
+
+    response = None
+    for suffix, encoding in ENCODINGS:
+        if encoding in accepted and (DIST_DIR / (filename + suffix)).is_file():
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
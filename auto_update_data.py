@@ -7,6 +7,8 @@ import os
 import json
 import zipfile
 import shutil
+import subprocess
+import sys
 from datetime import datetime
 from pathlib import Path
 
@@ -154,6 +156,12 @@ def main():
             shutil.copy(hot100_file, desktop_path)
             print(f"✓ Copied to Desktop: {desktop_path}")
 
+    if updated:
+        # Runs detached - the app may be waiting on this script at startup.
+        # Every web worker runs this check; warm_artwork.py lets only one run.
+        print("\n🎨 Pre-warming artwork cache in the background...")
+        subprocess.Popen([sys.executable, 'warm_artwork.py'], start_new_session=True)
+
     print("\n" + "="*60)
     print("Update check complete!")
     print("="*60)
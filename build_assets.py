@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Static Asset Build
+Minifies the CSS, converts fonts to WOFF2, fingerprints every file with a
+content hash and precompresses text assets with gzip and brotli.
+
+Usage:
+  python3 build_assets.py
+
+Output goes to static/dist/ along with manifest.json, which maps source names
+(e.g. "style.css") to their fingerprinted names. The app serves these from
+/assets/ with far-future immutable caching; see assets.py.
+"""
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+
+from assets import DIST_DIR, MANIFEST_PATH, STATIC_DIR
+
+FONT_TYPES = ('.otf', '.ttf')
+# Already-compressed formats gain nothing from gzip/brotli
+PRECOMPRESS_TYPES = ('.css', '.js', '.svg', '.otf', '.ttf', '.json', '.txt')
+
+FONT_URL = re.compile(r"url\((['\"]?)(/static/[^'\")]+)\1\)(\s*format\((['\"]?)[\w-]+\4\))?")
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name, data):
+    """fonts/x.otf -> fonts/x.<hash>.otf"""
+    path = Path(name)
+    return str(path.with_name(f"{path.stem}.{fingerprint(data)}{path.suffix}"))
+
+
+def minify_css(css):
+    """Whitespace/comment minifier - enough for our hand-written stylesheets"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r'\s*:\s*', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def to_woff2(path):
+    """WOFF2 bytes for a font, or None when fontTools/brotli are not installed"""
+    try:
+        from io import BytesIO
+        from fontTools.ttLib import TTFont
+        font = TTFont(path, recalcTimestamp=False)
+        font.flavor = 'woff2'
+        out = BytesIO()
+        font.save(out)
+        return out.getvalue()
+    except ImportError:
+        return None
+
+
+def compressors():
+    """{suffix: compress function} for the encodings available here"""
+    available = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        available['.br'] = lambda data: brotli.compress(data, quality=11)
+    except ImportError:
+        print("⚠️  brotli not installed - skipping .br files")
+    return available
+
+
+class Build:
+    def __init__(self):
+        self.manifest = {}
+        self.compress = compressors()
+        self.original_bytes = 0
+        self.output_bytes = 0
+
+    def write(self, name, data, original_size):
+        """Write one fingerprinted asset (plus smaller precompressed copies)"""
+        built = hashed_name(name, data)
+        target = DIST_DIR / built
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        self.manifest[name] = built.replace('\\', '/')
+
+        smallest = len(data)
+        if target.suffix in PRECOMPRESS_TYPES:
+            for suffix, compress in self.compress.items():
+                packed = compress(data)
+                if len(packed) < len(data):
+                    target.with_name(target.name + suffix).write_bytes(packed)
+                    smallest = min(smallest, len(packed))
+
+        self.original_bytes += original_size
+        self.output_bytes += smallest
+        print(f"  {name:<48} {original_size / 1024:>7.1f} KB -> {smallest / 1024:>7.1f} KB  {built}")
+
+    def font_urls(self, match):
+        """CSS url(/static/...) -> fingerprinted url, WOFF2 first for fonts"""
+        source = match.group(2)[len('/static/'):]
+        if source not in self.manifest:
+            return match.group(0)
+        urls = []
+        woff2 = str(Path(source).with_suffix('.woff2'))
+        if Path(source).suffix in FONT_TYPES and woff2 in self.manifest:
+            urls.append(f"url('/assets/{self.manifest[woff2]}') format('woff2')")
+        urls.append(f"url('/assets/{self.manifest[source]}'){match.group(3) or ''}")
+        return ','.join(urls)
+
+    def run(self):
+        if DIST_DIR.exists():
+            shutil.rmtree(DIST_DIR)
+        DIST_DIR.mkdir(parents=True)
+
+        sources = sorted(p for p in STATIC_DIR.rglob('*')
+                         if p.is_file() and DIST_DIR not in p.parents)
+
+        # Fonts and other files first, so the CSS can point at their final names
+        for path in sources:
+            if path.suffix == '.css':
+                continue
+            name = path.relative_to(STATIC_DIR).as_posix()
+            data = path.read_bytes()
+            self.write(name, data, len(data))
+            if path.suffix in FONT_TYPES:
+                woff2 = to_woff2(path)
+                if woff2 is None:
+                    print("⚠️  fontTools not installed - skipping WOFF2 conversion")
+                else:
+                    self.write(str(Path(name).with_suffix('.woff2')), woff2, len(woff2))
+
+        for path in sources:
+            if path.suffix != '.css':
+                continue
+            name = path.relative_to(STATIC_DIR).as_posix()
+            css = path.read_text(encoding='utf-8')
+            css = FONT_URL.sub(self.font_urls, minify_css(css))
+            self.write(name, css.encode('utf-8'), path.stat().st_size)
+
+        with open(MANIFEST_PATH, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+
+def main():
+    print("=" * 60)
+    print("Building static assets")
+    print("=" * 60)
+
+    build = Build()
+    build.run()
+
+    saved = build.original_bytes - build.output_bytes
+    print("=" * 60)
+    print(f"✅ {len(build.manifest)} assets written to {DIST_DIR}")
+    print(f"   {build.original_bytes / 1024:.1f} KB -> {build.output_bytes / 1024:.1f} KB "
+          f"smallest transfer ({saved / 1024:.1f} KB saved)")
+
+
+if __name__ == '__main__':
+    main()
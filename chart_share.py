@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Chart Share
+Weekly entries, rank-weighted points and share of all chart points for every
+artist credit, precomputed per chart on load so any career curve is a slice
+"""
+import numpy as np
+
+# Rolling windows offered by the API (weeks); 1 is the plain weekly series
+WINDOWS = (1, 4, 13, 52)
+
+
+def _expand_ranges(lo, hi):
+    """Concatenation of arange(lo[i], hi[i]) for every i, without a Python loop"""
+    lengths = hi - lo
+    if not lengths.sum():
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(lo - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def _trailing_sum(values, window):
+    """Sum of each value and the window - 1 before it"""
+    totals = np.cumsum(values)
+    totals[window:] = totals[window:] - totals[:-window]
+    return totals
+
+
+class ChartShare:
+    """Per-(credit, week) entries and points for a whole chart
+
+    Points are chart size + 1 - rank (101 - rank on the Hot 100). chart.artist_keys
+    (credit code * weeks + week) is sorted, so each credit-week is a contiguous
+    run and one np.add.reduceat over it gives every artist's series at once.
+    """
+
+    def __init__(self, chart):
+        rank = chart.data['Rank'].to_numpy().astype(np.int32)
+        points = rank.max(initial=0) + 1 - rank
+        self.n_weeks = len(chart.weeks)
+        self.dates = np.datetime_as_string(chart.weeks, unit='D')
+
+        week = np.repeat(np.arange(self.n_weeks), np.diff(chart.week_offsets))
+        self.week_points = np.bincount(week, weights=points, minlength=self.n_weeks)
+
+        keys = chart.artist_keys
+        if len(keys) == 0:
+            self.keys = keys
+            self.entries = self.points = np.zeros(0, dtype=np.int32)
+            return
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        self.keys = keys[starts]
+        self.entries = np.diff(np.r_[starts, len(keys)]).astype(np.int32)
+        self.points = np.add.reduceat(points[chart.artist_order], starts).astype(np.int32)
+
+    def _dense(self, codes, first, stop):
+        """(entries, points) arrays over weeks first..stop-1, summed over credits"""
+        codes = np.asarray(codes, dtype=np.int64) * self.n_weeks
+        lo = np.searchsorted(self.keys, codes + first, side='left')
+        hi = np.searchsorted(self.keys, codes + stop, side='left')
+        cells = _expand_ranges(lo, hi)
+        week = self.keys[cells] % self.n_weeks - first
+        entries = np.bincount(week, weights=self.entries[cells], minlength=stop - first)
+        points = np.bincount(week, weights=self.points[cells], minlength=stop - first)
+        return entries, points
+
+    def series(self, codes, first=0, stop=None, window=1):
+        """Career curve for the given credits within weeks first..stop-1, or None
+
+        Covers the first through last charting week. With window > 1 entries and
+        points are trailing means and share is points over all chart points in
+        the same window.
+        """
+        stop = self.n_weeks if stop is None else stop
+        # Start early enough that the first window is complete
+        base = max(0, first - window + 1)
+        entries, points = self._dense(codes, base, stop)
+        charted = np.flatnonzero(entries[first - base:]) + (first - base)
+        if not len(charted):
+            return None
+
+        total = self.week_points[base:stop]
+        if window > 1:
+            entries = _trailing_sum(entries, window) / window
+            points = _trailing_sum(points, window) / window
+            total = _trailing_sum(total, window) / window
+        share = np.divide(points, total, out=np.zeros_like(points), where=total > 0)
+
+        span = slice(charted[0], charted[-1] + 1)
+        peak = charted[0] + int(np.argmax(share[span]))
+        return {
+            'window': window,
+            'dates': self.dates[base:stop][span].tolist(),
+            'entries': np.round(entries[span], 2).tolist(),
+            'points': np.round(points[span], 2).tolist(),
+            'share': np.round(share[span], 5).tolist(),
+            'weeks_charted': len(charted),
+            'peak_share': round(float(share[peak]), 5),
+            'peak_share_date': str(self.dates[base + peak]),
+        }
+
+
+NAME = 'chart_share'
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: recompute the series whenever the chart changes"""
+    chart.derived[NAME] = ChartShare(chart)
+
+
+def track_charts(charts):
+    """Maintain chart-share series for every chart as it loads and refreshes"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def get_chart_share(chart):
+    """Chart-share index for a loaded chart"""
+    derived = chart.load().derived
+    if NAME not in derived:
+        _on_chart_update(chart.snapshot(), 0)
+    return derived[NAME]
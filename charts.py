@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Chart Engine
+Registry of Billboard chart CSVs with lazy loading and per-chart indexes
+"""
+import copy
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path('data')
+DESKTOP_DIR = Path.home() / 'Desktop'
+
+# Chart registry - every Kaggle chart CSV is described here.
+# To add another chart (e.g. a file found in data/), add an entry with the
+# candidate file names, the source column names and the year bounds.
+# Charts are only read from disk the first time they are used.
+CHART_REGISTRY = {
+    'hot100': {
+        'title': 'Billboard Hot 100',
+        'files': ['hot-100-current.csv', 'hot100.csv', 'billboard_hot_100.csv'],
+        'search_paths': [Path('.'), DATA_DIR, DESKTOP_DIR],
+        'columns': {
+            'date': 'Date',
+            'item': 'Song',
+            'artist': 'Artist',
+            'rank': 'Rank',
+            'last_week': 'Last Week',
+            'peak': 'Peak Position',
+        },
+        'item_label': 'song',
+        'min_year': 1958,
+        'max_year': None,
+        'template': 'hot100.html',
+        'required': True,
+    },
+    'billboard200': {
+        'title': 'Billboard 200',
+        'files': ['billboard200.csv', 'billboard-200-current.csv'],
+        'search_paths': [Path('.'), DATA_DIR],
+        'columns': {
+            'date': 'Date',
+            'item': 'Song',  # Song column contains album names in Billboard 200 data
+            'artist': 'Artist',
+            'rank': 'Rank',
+            'last_week': 'Last Week',
+            'peak': 'Peak Position',
+        },
+        'item_label': 'album',
+        'min_year': 1963,
+        'max_year': None,
+        'template': 'billboard200.html',
+        'required': False,
+    },
+}
+
+
+# Compact dtypes for loaded charts. Ranks, last week, peak and weeks on
+# chart all fit in int16; NEW_ENTRY marks "no previous position".
+RANK_DTYPE = np.int16
+NEW_ENTRY = 0
+
+# Print bytes per column before/after compaction when a chart loads
+MEMORY_REPORT = os.environ.get('CHART_MEMORY_REPORT', '1') != '0'
+
+
+# Seconds between checks for an updated CSV on disk (0 disables)
+REFRESH_SECONDS = int(os.environ.get('CHART_REFRESH_SECONDS', '300'))
+
+
+def file_version(path):
+    """Identify a data file's contents by modification time and size"""
+    stat = Path(path).stat()
+    return f"{int(stat.st_mtime)}-{stat.st_size}"
+
+
+def compact_strings(values):
+    """Return (stripped, lowercased) categoricals for a text column
+
+    Strings are stripped and lowercased once per distinct value rather than
+    once per row, which matters when a title appears on hundreds of charts.
+    """
+    cat = values.fillna('').astype(str).astype('category')
+    codes = cat.cat.codes.to_numpy()
+
+    stripped_codes, stripped = pd.factorize(cat.cat.categories.str.strip())
+    codes = stripped_codes[codes]
+    lower_codes, lower = pd.factorize(stripped.str.lower())
+
+    return (
+        pd.Categorical.from_codes(codes, categories=stripped),
+        pd.Categorical.from_codes(lower_codes[codes], categories=lower),
+    )
+
+
+def compact_positions(raw, column):
+    """Parse a chart position column ('-'/blank/NaN = new) into int16"""
+    if column not in raw:
+        return np.full(len(raw), NEW_ENTRY, dtype=RANK_DTYPE)
+    values = pd.to_numeric(raw[column], errors='coerce').fillna(NEW_ENTRY)
+    return values.astype(RANK_DTYPE).to_numpy()
+
+
+def memory_report(before, after, source_columns):
+    """Bytes per column of the raw CSV frame vs the compact chart frame
+
+    source_columns maps compact column names to raw CSV column names;
+    derived columns (lowercase keys, weeks to date) have no "before".
+    """
+    before_usage = before.memory_usage(deep=True, index=False)
+    after_usage = after.memory_usage(deep=True, index=False)
+    columns = {}
+    for column in after.columns:
+        source = source_columns.get(column)
+        columns[column] = {
+            'before': int(before_usage.get(source, 0)) if source else 0,
+            'after': int(after_usage[column]),
+        }
+    return {
+        'columns': columns,
+        'before_total': int(before_usage.sum()),
+        'after_total': int(after_usage.sum()),
+    }
+
+
+def print_memory_report(title, report):
+    """Print a memory report as a small table"""
+    mb = 1024 * 1024
+    print(f"📊 {title} memory (before → after):")
+    for column, usage in report['columns'].items():
+        print(f"  - {column:<15} {usage['before'] / mb:8.1f} MB → {usage['after'] / mb:6.1f} MB")
+    print(f"  = {'total':<15} {report['before_total'] / mb:8.1f} MB → {report['after_total'] / mb:6.1f} MB")
+
+
+def safe_int(val, default=None):
+    """Convert a chart cell ('-', '', NaN, 0 mean "none") to int"""
+    if pd.isna(val):
+        return default
+    if isinstance(val, str) and (val.strip() == '-' or val.strip() == ''):
+        return default
+    try:
+        result = int(float(val))
+        return result if result != 0 else default
+    except (ValueError, TypeError):
+        return default
+
+
+def format_entries(rows):
+    """Chart rows as entry dicts for the chart templates and APIs"""
+    entries = []
+    for song, artist, rank, last_week, peak, weeks in zip(
+            rows['Song'], rows['Artist'], rows['Rank'], rows['Last Week'],
+            rows['Peak Position'], rows['Weeks To Date']):
+        rank = int(rank)
+        last_week = safe_int(last_week)
+        entry = {
+            'rank': rank,
+            'song': song,
+            'artist': artist,
+            'last_week': last_week,
+            'peak': safe_int(peak, rank),
+            'weeks': int(weeks),
+        }
+
+        # Calculate position change
+        if last_week is None:
+            entry['change'] = 'new'
+            entry['change_amount'] = 0
+        elif rank < last_week:
+            entry['change'] = 'up'
+            entry['change_amount'] = last_week - rank
+        elif rank > last_week:
+            entry['change'] = 'down'
+            entry['change_amount'] = rank - last_week
+        else:
+            entry['change'] = 'same'
+            entry['change_amount'] = 0
+
+        entries.append(entry)
+    return entries
+
+
+class ChartState:
+    """One version of a chart's data, its indexes and everything derived from it
+
+    A chart publishes a new state by swapping a single reference, so readers
+    never see new data next to indexes built for the old data. Listener
+    indexes are kept in derived, keyed by module.
+    """
+
+    FIELDS = ('path', 'version', 'data', 'weeks', 'week_offsets', 'entry_rows',
+              'artist_order', 'artist_keys', 'artist_names_lower')
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+        self.derived = {}
+
+
+def _state_field(name):
+    return property(lambda self: getattr(self._state, name), doc=f"{name} of the current state")
+
+
+class Chart:
+    """A single chart dataset, loaded on first use"""
+
+    def __init__(self, key, definition):
+        self.key = key
+        self.definition = definition
+        self.title = definition['title']
+        self.item_label = definition['item_label']
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._listeners = []
+        self._last_check = 0.0
+        self._refreshing = False
+        self._snapshot = False
+        self._previous = None
+        self._state = ChartState()
+        self.memory_report = None
+
+    # Data and indexes always come from one state (see ChartState)
+    path = _state_field('path')
+    version = _state_field('version')
+    data = _state_field('data')
+    weeks = _state_field('weeks')
+    week_offsets = _state_field('week_offsets')
+    entry_rows = _state_field('entry_rows')
+    artist_order = _state_field('artist_order')
+    artist_keys = _state_field('artist_keys')
+    artist_names_lower = _state_field('artist_names_lower')
+
+    @property
+    def derived(self):
+        """Listener indexes for the current state ({module name: index})"""
+        return self._state.derived
+
+    def snapshot(self, state=None):
+        """A read-only view of this chart pinned to one state (the current one by default)
+
+        Indexes built from a snapshot keep reading the data they were built
+        from, whatever the chart publishes later.
+        """
+        view = copy.copy(self)
+        view._state = self._state if state is None else state
+        view._snapshot = True
+        return view
+
+    def previous_index(self, name):
+        """During an append-only refresh, a private copy of the replaced state's
+        index for name (rebased onto this view), or None"""
+        if self._previous is None:
+            return None
+        index = self._previous.derived.get(name)
+        return index.rebased(self) if index is not None else None
+
+    def find_file(self):
+        """Return the first existing CSV for this chart, or None"""
+        for directory in self.definition['search_paths']:
+            for name in self.definition['files']:
+                filepath = Path(directory) / name
+                if filepath.exists():
+                    return filepath
+        return None
+
+    @property
+    def available(self):
+        return self._loaded or self.find_file() is not None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """Load the CSV and build indexes (thread-safe, runs once)"""
+        if self._snapshot:
+            return self
+        if self._loaded:
+            self._maybe_refresh()
+            return self
+        with self._lock:
+            if self._loaded:
+                return self
+
+            path = self.find_file()
+            if path is None:
+                raise FileNotFoundError(
+                    f"{self.title} data not found! Run auto_update_data.py first.")
+
+            print(f"Loading {self.title} data from {path.name}...")
+            state = self._read(path)
+            print(f"Loaded {len(state.data)} {self.title} records!")
+
+            # Listeners build derived indexes before anyone else sees the chart
+            self._publish(state, 0)
+            self._loaded = True
+            self._last_check = time.time()
+        return self
+
+    def _read(self, path):
+        """Read the CSV at path into a new (unpublished) ChartState"""
+        version = file_version(path)
+        raw = pd.read_csv(path, low_memory=False)
+        fields = self._build(raw)
+        if MEMORY_REPORT:
+            cols = self.definition['columns']
+            self.memory_report = memory_report(raw, fields['data'], {
+                'Date': cols['date'], 'Song': cols['item'], 'Artist': cols['artist'],
+                'Rank': cols['rank'], 'Last Week': cols.get('last_week'),
+                'Peak Position': cols.get('peak'),
+            })
+            print_memory_report(self.title, self.memory_report)
+        del raw
+        return ChartState(path=path, version=version, **fields)
+
+    def _publish(self, state, first_new_week):
+        """Run the listeners against state, then make it current in one swap"""
+        staged = self.snapshot(state)
+        staged._previous = self._state if first_new_week else None
+        self._notify(staged, first_new_week)
+        # Indexes keep the staged view; don't let it pin the old state
+        staged._previous = None
+        self._state = state
+
+    def subscribe(self, callback):
+        """Call callback(chart, first_new_week) for every load or refresh
+
+        Callbacks get a snapshot of the new state before it is published and
+        store what they build in chart.derived, so it goes live together with
+        the data. first_new_week is 0 after a full (re)load, or the week index
+        of the first appended week when a refresh only added weeks at the end
+        (chart.previous_index() then has the old index to fold them into).
+        """
+        self._listeners.append(callback)
+        if self._loaded:
+            callback(self.snapshot(), 0)
+
+    def _notify(self, staged, first_new_week):
+        for callback in self._listeners:
+            try:
+                callback(staged, first_new_week)
+            except Exception as e:
+                print(f"⚠️  {self.title} update listener failed: {e}")
+
+    def refresh(self):
+        """Reload if the CSV changed on disk (returns True if it did)"""
+        path = self.find_file()
+        if not self._loaded or path is None or file_version(path) == self.version:
+            return False
+
+        with self._lock:
+            old = self._state
+            print(f"Reloading {self.title} data from {path.name}...")
+            state = self._read(path)
+
+            # Weekly updates only append weeks; anything else is a full rebuild
+            n = len(old.weeks)
+            appended = (
+                len(state.weeks) > n
+                and np.array_equal(state.weeks[:n], old.weeks)
+                and np.array_equal(state.week_offsets[:n + 1], old.week_offsets)
+            )
+            self._publish(state, n if appended else 0)
+        return True
+
+    def _maybe_refresh(self):
+        """Check for a newer CSV at most every REFRESH_SECONDS, in the background"""
+        if not REFRESH_SECONDS or self._refreshing:
+            return
+        now = time.time()
+        if now - self._last_check < REFRESH_SECONDS:
+            return
+        self._last_check = now
+        self._refreshing = True
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Could not refresh {self.title}: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, name=f'{self.key}-refresh', daemon=True).start()
+
+    def _build(self, raw):
+        """Normalize columns to compact dtypes, sort by week and rank, and build indexes"""
+        cols = self.definition['columns']
+        song, song_lower = compact_strings(raw[cols['item']])
+        artist, artist_lower = compact_strings(raw[cols['artist']])
+        data = pd.DataFrame({
+            'Date': pd.to_datetime(raw[cols['date']], errors='coerce'),
+            'Song': song,
+            'Artist': artist,
+            'Song_Lower': song_lower,
+            'Artist_Lower': artist_lower,
+            'Rank': pd.to_numeric(raw[cols['rank']], errors='coerce'),
+            'Last Week': compact_positions(raw, cols.get('last_week')),
+            'Peak Position': compact_positions(raw, cols.get('peak')),
+        })
+        data = data.dropna(subset=['Date', 'Rank'])
+        data['Rank'] = data['Rank'].astype(RANK_DTYPE)
+
+        # Missing peak means this is the entry's best week so far
+        no_peak = data['Peak Position'] == NEW_ENTRY
+        data.loc[no_peak, 'Peak Position'] = data.loc[no_peak, 'Rank']
+
+        min_year = self.definition.get('min_year')
+        max_year = self.definition.get('max_year')
+        if min_year:
+            data = data[data['Date'].dt.year >= min_year]
+        if max_year:
+            data = data[data['Date'].dt.year <= max_year]
+
+        data = data.sort_values(['Date', 'Rank'], kind='mergesort').reset_index(drop=True)
+
+        # One entry per (song, artist) ignoring case, the same key entry_rows
+        # uses, so a credit whose capitalization changed stays one chart run
+        entries = data.groupby(['Song_Lower', 'Artist_Lower'], sort=False, observed=True)
+
+        # Cumulative weeks on chart up to and including each row
+        data['Weeks To Date'] = (entries.cumcount() + 1).astype(RANK_DTYPE)
+
+        # Integer entry ID, numbered by first appearance so IDs stay stable
+        # when new weeks are appended to the file
+        data['Entry'] = entries.ngroup().astype(np.int32)
+
+        # Week axis: sorted unique weeks and the row offset where each starts
+        weeks, starts = np.unique(data['Date'].values, return_index=True)
+
+        # Rows grouped by artist credit, in date order within each credit.
+        # artist_keys (credit code * weeks + week index) is sorted, so any
+        # credit's rows for any range of weeks are found by binary search.
+        artist_codes = data['Artist'].cat.codes.to_numpy().astype(np.int64)
+        row_weeks = np.repeat(np.arange(len(weeks), dtype=np.int64), np.diff(np.append(starts, len(data))))
+        artist_order = np.argsort(artist_codes, kind='stable')
+
+        return {
+            'data': data,
+            'weeks': weeks,
+            'week_offsets': np.append(starts, len(data)),
+            'artist_order': artist_order.astype(np.int32),
+            'artist_keys': (artist_codes * len(weeks) + row_weeks)[artist_order],
+            'artist_names_lower': data['Artist'].cat.categories.str.lower(),
+            # Row positions for each (song, artist), already in date order
+            'entry_rows': entries.indices,
+        }
+
+    def week_strings(self, descending=True):
+        """All chart weeks as YYYY-MM-DD strings"""
+        self.load()
+        weeks = pd.DatetimeIndex(self.weeks).strftime('%Y-%m-%d').tolist()
+        return weeks[::-1] if descending else weeks
+
+    def snap_week(self, date):
+        """Index of the chart week containing an arbitrary date (O(log n))
+
+        Chart dates are week-ending dates, so a date snaps to the first chart
+        on or after it, clamped to the first/last week on record.
+        """
+        self.load()
+        target = np.datetime64(pd.to_datetime(date), 'ns')
+        pos = int(np.searchsorted(self.weeks, target, side='left'))
+        return min(pos, len(self.weeks) - 1)
+
+    def week_date(self, pos):
+        """Chart week at an index on the week axis, as YYYY-MM-DD"""
+        return pd.Timestamp(self.weeks[pos]).strftime('%Y-%m-%d')
+
+    def week_range(self, start, end):
+        """(first, stop) week indexes covering start..end, inclusive"""
+        self.load()
+        first = self.snap_week(start)
+        stop = self.snap_week(end) + 1
+        return first, max(first, stop)
+
+    def range_rows(self, first, stop):
+        """Rows for weeks first..stop-1 as one contiguous slice"""
+        self.load()
+        return self.data.iloc[self.week_offsets[first]:self.week_offsets[stop]]
+
+    def era_weeks(self, start=None, end=None):
+        """(first, stop) week indexes for charts dated start..end, inclusive
+
+        Either bound may be empty (open-ended), a date, or a bare year -
+        '1985' as an end bound means the end of 1985.
+        """
+        self.load()
+        first, stop = 0, len(self.weeks)
+        if start:
+            target = np.datetime64(pd.to_datetime(str(start)), 'ns')
+            first = int(np.searchsorted(self.weeks, target, side='left'))
+        if end:
+            end = str(end).strip()
+            end = f'{end}-12-31' if end.isdigit() and len(end) == 4 else end
+            target = np.datetime64(pd.to_datetime(end), 'ns')
+            stop = int(np.searchsorted(self.weeks, target, side='right'))
+        return first, max(first, stop)
+
+    def artist_codes(self, name, exact=False):
+        """Artist credit codes matching a name (case-insensitive substring, or exact)"""
+        self.load()
+        name = name.strip().lower()
+        if exact:
+            return np.flatnonzero(self.artist_names_lower == name)
+        return np.flatnonzero(self.artist_names_lower.str.contains(name, regex=False))
+
+    def artist_row_bounds(self, codes, first=0, stop=None):
+        """(lo, hi) arrays into artist_order for each credit's rows in weeks first..stop-1"""
+        self.load()
+        stop = len(self.weeks) if stop is None else stop
+        codes = np.asarray(codes, dtype=np.int64) * len(self.weeks)
+        lo = np.searchsorted(self.artist_keys, codes + first, side='left')
+        hi = np.searchsorted(self.artist_keys, codes + stop, side='left')
+        return lo, hi
+
+    def artist_rows(self, codes, first=0, stop=None):
+        """Row positions (in date/rank order) for credits within weeks first..stop-1"""
+        lo, hi = self.artist_row_bounds(codes, first, stop)
+        if not len(lo):
+            return np.zeros(0, dtype=np.int32)
+        rows = np.concatenate([self.artist_order[a:b] for a, b in zip(lo, hi)])
+        return np.sort(rows)
+
+    def week_rows(self, date):
+        """Rows for an exact chart week, in rank order"""
+        self.load()
+        target = np.datetime64(pd.to_datetime(date), 'ns')
+        pos = np.searchsorted(self.weeks, target)
+        if pos >= len(self.weeks) or self.weeks[pos] != target:
+            return self.data.iloc[0:0]
+        return self.range_rows(pos, pos + 1)
+
+    def week_entries(self, date):
+        """Chart entries for one week, formatted for the chart templates"""
+        return format_entries(self.week_rows(date))
+
+    def range_entries(self, first, stop):
+        """Chart entries for weeks first..stop-1, grouped by week"""
+        rows = self.range_rows(first, stop)
+        entries = format_entries(rows)
+        base = self.week_offsets[first]
+        return [
+            {
+                'date': self.week_date(pos),
+                'entries': entries[self.week_offsets[pos] - base:self.week_offsets[pos + 1] - base],
+            }
+            for pos in range(first, stop)
+        ]
+
+    def week_diff(self, a, b):
+        """Entries added, dropped and moved between week indexes a and b
+
+        Both weeks are contiguous row slices; entries are aligned on their
+        integer IDs, so the comparison is a couple of sorted-array operations.
+        Deltas are positive for entries that climbed from week a to week b.
+        """
+        self.load()
+        data = self.data
+        start_a, stop_a = int(self.week_offsets[a]), int(self.week_offsets[a + 1])
+        start_b, stop_b = int(self.week_offsets[b]), int(self.week_offsets[b + 1])
+        entry = data['Entry'].to_numpy()
+        rank = data['Rank'].to_numpy()
+
+        _, in_a, in_b = np.intersect1d(
+            entry[start_a:stop_a], entry[start_b:stop_b], assume_unique=True, return_indices=True)
+        kept_a = np.zeros(stop_a - start_a, dtype=bool)
+        kept_a[in_a] = True
+        kept_b = np.zeros(stop_b - start_b, dtype=bool)
+        kept_b[in_b] = True
+
+        # Rows are in rank order within a week, so sorting by row keeps rank order
+        order = np.argsort(in_b)
+        moved_a, moved_b = start_a + in_a[order], start_b + in_b[order]
+        delta = rank[moved_a].astype(np.int32) - rank[moved_b]
+        changed = delta != 0
+
+        song_names = data['Song'].cat.categories
+        song_codes = data['Song'].cat.codes.to_numpy()
+        artist_names = data['Artist'].cat.categories
+        artist_codes = data['Artist'].cat.codes.to_numpy()
+        label = self.item_label
+
+        def describe(row):
+            return {label: song_names[song_codes[row]], 'artist': artist_names[artist_codes[row]]}
+
+        return {
+            'added': [
+                dict(describe(row), rank=int(rank[row]))
+                for row in range(start_b, stop_b) if not kept_b[row - start_b]
+            ],
+            'dropped': [
+                dict(describe(row), last_rank=int(rank[row]))
+                for row in range(start_a, stop_a) if not kept_a[row - start_a]
+            ],
+            'moved': [
+                dict(describe(row_b), **{'from': int(rank[row_a]), 'to': int(rank[row_b]), 'change': int(d)})
+                for row_a, row_b, d in zip(moved_a[changed], moved_b[changed], delta[changed])
+            ],
+            'unchanged': int((~changed).sum()),
+        }
+
+    def entry_history(self, item, artist):
+        """Full week-by-week history for one song/album, or None"""
+        self.load()
+        rows = self.entry_rows.get((item.strip().lower(), artist.strip().lower()))
+        if rows is None or len(rows) == 0:
+            return None
+
+        entry_data = self.data.iloc[rows]
+        history = [
+            {'date': date.strftime('%Y-%m-%d'), 'rank': int(rank), 'weeks': idx}
+            for idx, (date, rank) in enumerate(zip(entry_data['Date'], entry_data['Rank']), start=1)
+        ]
+        return {
+            'history': history,
+            'peak': int(entry_data['Rank'].min()),
+            'total_weeks': len(entry_data),
+        }
+
+
+CHARTS = {key: Chart(key, definition) for key, definition in CHART_REGISTRY.items()}
+
+
+def reset_after_fork():
+    """Make the inherited charts safe to use in a process forked from a worker
+
+    Another thread may have held a chart lock at the moment of the fork, and a
+    short-lived child has no business reloading data in the background.
+    """
+    global REFRESH_SECONDS
+    REFRESH_SECONDS = 0
+    for chart in CHARTS.values():
+        chart._lock = threading.Lock()
+        chart._refreshing = False
+
+
+def get_chart(key):
+    """Return a loaded chart by registry key (KeyError if unknown)"""
+    return CHARTS[key].load()
+
+
+def warm_up(keys=None, background=True):
+    """Load charts ahead of first use, optionally in a background thread"""
+    keys = keys or [key for key, chart in CHARTS.items() if chart.available]
+
+    def _load_all():
+        for key in keys:
+            try:
+                CHARTS[key].load()
+            except Exception as e:
+                print(f"⚠️  Could not load {key}: {e}")
+
+    if background:
+        thread = threading.Thread(target=_load_all, name='chart-warmup', daemon=True)
+        thread.start()
+        return thread
+    _load_all()
+    return None
+
+
+def warm_up_from_env():
+    """Warm charts listed in WARM_CHARTS (comma-separated, 'all' or 'none')"""
+    setting = os.environ.get('WARM_CHARTS', 'hot100,billboard200').strip().lower()
+    if setting in ('', 'none'):
+        return None
+    keys = None if setting == 'all' else [k.strip() for k in setting.split(',') if k.strip() in CHARTS]
+    return warm_up(keys, background=True)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Export Jobs
+Excel/CSV/ZIP exports built in a small, bounded set of child processes, so
+heavy pandas/openpyxl work never runs in (or holds the GIL of) a web worker.
+Each job runs in a process forked from the web worker when the job starts,
+so it reads the charts the worker already has loaded (shared copy-on-write)
+instead of loading the CSV again. Raw chart rows (NDJSON/CSV) are streamed
+straight from the chart index instead.
+
+Jobs are tracked as files under EXPORT_DIR (<job_id>/job.json plus the output
+file), so any web worker can answer a status poll or serve the download,
+whichever worker actually ran the job.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import charts
+from charts import CHARTS, NEW_ENTRY, get_chart
+
+# Absolute, so send_file (which resolves relative paths against the app root)
+# finds the files jobs wrote relative to the working directory
+EXPORT_DIR = Path(os.environ.get('EXPORT_DIR', 'data/exports')).resolve()
+# Export processes running at once per web worker, and jobs each web worker will queue
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '1'))
+MAX_PENDING = int(os.environ.get('EXPORT_MAX_PENDING', '20'))
+# Finished jobs (and their files) are removed after this many hours
+EXPORT_TTL = int(os.environ.get('EXPORT_TTL_HOURS', '24')) * 3600
+# Export processes run at lower CPU priority than the web workers
+EXPORT_NICE = int(os.environ.get('EXPORT_NICE', '10'))
+# Export processes still running after this many seconds are killed
+EXPORT_TIMEOUT = int(os.environ.get('EXPORT_TIMEOUT_SECONDS', '600'))
+
+# Forked children share the loaded charts; without fork (Windows) jobs run
+# on the export threads themselves
+_fork = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+
+MAX_BULK_ARTISTS = 50
+
+FORMATS = ('csv', 'xlsx')
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+_queue = queue.Queue()
+_threads = []
+_pending = set()
+_lock = threading.Lock()
+
+
+class ExportError(ValueError):
+    """Invalid export request"""
+
+
+class QueueFull(RuntimeError):
+    """Too many exports already waiting in this worker"""
+
+
+# ---------------------------------------------------------------------------
+# Export builders (run in the export processes)
+# ---------------------------------------------------------------------------
+
+def chart_table(chart, rows):
+    """Export columns for a slice of chart rows, one row per entry"""
+    return pd.DataFrame({
+        'Date': rows['Date'].dt.strftime('%Y-%m-%d'),
+        'Rank': rows['Rank'],
+        chart.item_label.title(): rows['Song'],
+        'Artist': rows['Artist'],
+        'Last Week': rows['Last Week'].where(rows['Last Week'] != NEW_ENTRY).astype('Int16'),
+        'Peak Position': rows['Peak Position'],
+        'Weeks On Chart': rows['Weeks To Date'],
+    })
+
+
+def write_artist_workbook(artist_name, output_file):
+    """Week-by-song rank pivot for an artist; returns an error message or None"""
+    chart = get_chart('hot100')
+    data = chart.data
+
+    # Substring match on artist credits, then only touch the matching rows
+    filtered_data = data.iloc[chart.artist_rows(chart.artist_codes(artist_name))]
+
+    if filtered_data.empty:
+        return f"No results found for artist: {artist_name}"
+
+    # Create a 'Song (Artist)' column
+    filtered_data = filtered_data[['Date', 'Rank']].assign(Song_Artist=(
+        filtered_data['Song_Lower'].astype(str).str.title() + " ("
+        + filtered_data['Artist_Lower'].astype(str).str.title() + ")"
+    ))
+
+    # Pivot table using actual dates from the data
+    pivot_table = filtered_data.pivot_table(
+        index='Date',
+        columns='Song_Artist',
+        values='Rank',
+        aggfunc='first'
+    )
+
+    # Fill in missing weeks (only those present in the data)
+    all_dates = chart.weeks[chart.weeks >= filtered_data['Date'].min().to_datetime64()]
+    pivot_table = pivot_table.reindex(pd.to_datetime(all_dates))
+
+    # Sort columns by first appearance
+    first_appearance = filtered_data.groupby('Song_Artist')['Date'].min()
+    sorted_columns = first_appearance.sort_values().index
+    pivot_table = pivot_table[sorted_columns]
+
+    # Format index as text
+    pivot_table.index = pivot_table.index.strftime('%Y-%m-%d')
+
+    pivot_table.to_excel(output_file)
+    return None
+
+
+def artist_filename(artist_name):
+    return f"{artist_name.title().replace(' ', '_').replace('/', '_')}_Chart_History.xlsx"
+
+
+def _export_artist(job_dir, params):
+    filename = artist_filename(params['artist'])
+    error = write_artist_workbook(params['artist'], job_dir / filename)
+    if error:
+        raise ExportError(error)
+    return filename
+
+
+def _export_artists(job_dir, params):
+    """ZIP of one workbook per artist (artists with no results are listed instead)"""
+    filename = 'Chart_Histories.zip'
+    missing = []
+    with tempfile.TemporaryDirectory(dir=job_dir) as tmp, \
+            zipfile.ZipFile(job_dir / filename, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for artist_name in params['artists']:
+            workbook = Path(tmp) / artist_filename(artist_name)
+            error = write_artist_workbook(artist_name, workbook)
+            if error:
+                missing.append(error)
+                continue
+            archive.write(workbook, workbook.name)
+        if missing:
+            archive.writestr('not_found.txt', '\n'.join(missing) + '\n')
+    if len(missing) == len(params['artists']):
+        raise ExportError('No results found for any of the artists')
+    return filename
+
+
+def _export_year(job_dir, params):
+    """Every chart week of one calendar year, one row per entry"""
+    chart = get_chart(params['chart'])
+    year = params['year']
+    first = int(np.searchsorted(chart.weeks, np.datetime64(f'{year}-01-01'), side='left'))
+    stop = int(np.searchsorted(chart.weeks, np.datetime64(f'{year + 1}-01-01'), side='left'))
+    if first == stop:
+        raise ExportError(f'No {chart.title} charts in {year}')
+
+    table = chart_table(chart, chart.range_rows(first, stop))
+
+    filename = f"{chart.key}_{year}.{params['format']}"
+    if params['format'] == 'csv':
+        table.to_csv(job_dir / filename, index=False)
+    else:
+        table.to_excel(job_dir / filename, index=False, sheet_name=str(year))
+    return filename
+
+
+BUILDERS = {
+    'artist': _export_artist,
+    'artists': _export_artists,
+    'year': _export_year,
+}
+
+
+# ---------------------------------------------------------------------------
+# Streaming exports (run in the request, one batch of rows at a time)
+# ---------------------------------------------------------------------------
+
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+# Rows formatted per chunk; memory use is bounded by this, not the export size
+STREAM_BATCH_ROWS = 5000
+
+
+def _format_batch(table, export_format, header):
+    if export_format == 'csv':
+        return table.to_csv(index=False, header=header)
+    table.columns = [c.lower().replace(' ', '_') for c in table.columns]
+    text = table.to_json(orient='records', lines=True, force_ascii=False)
+    return text if text.endswith('\n') else text + '\n'
+
+
+def stream_rows(chart, export_format, first=0, stop=None, codes=None, batch_rows=STREAM_BATCH_ROWS):
+    """Encoded chunks of chart rows for weeks first..stop-1 (optionally only the
+    given artist credits), in date/rank order
+
+    Only row positions are held for the whole export; each batch is sliced and
+    formatted on its own. Everything is read from one snapshot of the chart,
+    so a reload mid-stream doesn't mix two versions of the data.
+    """
+    chart = chart.load().snapshot()
+    data, offsets = chart.data, chart.week_offsets
+    stop = len(chart.weeks) if stop is None else stop
+    rows = None if codes is None else chart.artist_rows(codes, first, stop)
+    total = int(offsets[stop] - offsets[first]) if rows is None else len(rows)
+
+    if total == 0 and export_format == 'csv':
+        yield chart_table(chart, data.iloc[0:0]).to_csv(index=False).encode('utf-8')
+    for start in range(0, total, batch_rows):
+        if rows is None:
+            lo = offsets[first] + start
+            batch = data.iloc[lo:min(lo + batch_rows, offsets[stop])]
+        else:
+            batch = data.iloc[rows[start:start + batch_rows]]
+        yield _format_batch(chart_table(chart, batch), export_format, start == 0).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """gzip-encode a stream of byte chunks as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        packed = compressor.compress(chunk)
+        if packed:
+            yield packed
+    yield compressor.flush()
+
+
+# ---------------------------------------------------------------------------
+# Job state (shared between web workers through the filesystem)
+# ---------------------------------------------------------------------------
+
+def _job_dir(job_id):
+    return EXPORT_DIR / job_id
+
+
+def _write_job(job):
+    path = _job_dir(job['id']) / 'job.json'
+    tmp = path.with_suffix(f'.tmp{os.getpid()}')
+    with open(tmp, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp, path)
+
+
+def get_job(job_id):
+    """Job state dict, or None for unknown/expired jobs"""
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(_job_dir(job_id) / 'job.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _update(job_id, **changes):
+    job = get_job(job_id)
+    if job is not None:
+        job.update(changes)
+        _write_job(job)
+
+
+def run_job(job_id):
+    """Build one export (export process entry point)"""
+    job = get_job(job_id)
+    _update(job_id, status=RUNNING, started_at=time.time())
+    try:
+        filename = BUILDERS[job['type']](_job_dir(job_id), job['params'])
+        _update(job_id, status=DONE, filename=filename, finished_at=time.time())
+    except Exception as e:
+        _update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+
+
+def _lower_priority(target=0):
+    # target 0 is the whole process; a thread ID only that thread (Linux)
+    try:
+        os.setpriority(os.PRIO_PROCESS, target, EXPORT_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+def _run_forked(job_id):
+    """Child process entry point: the web worker's charts are already here"""
+    charts.reset_after_fork()
+    _lower_priority()
+    run_job(job_id)
+
+
+def _prepare(job):
+    """Load and import everything the job needs before forking
+
+    The child must never load a chart or import a module itself: another
+    thread of the web worker may have held the lock for it at the moment of
+    the fork, and that lock never gets released in the child.
+    """
+    get_chart(job['params'].get('chart', 'hot100'))
+    import openpyxl  # pandas would import it on the first to_excel
+
+
+def _run(job_id):
+    """Run one job in a forked child and wait for it (export thread side)"""
+    if _fork is None:
+        run_job(job_id)
+        return
+    _prepare(get_job(job_id))
+    process = _fork.Process(target=_run_forked, args=(job_id,), name=f'export-{job_id}', daemon=True)
+    process.start()
+    process.join(EXPORT_TIMEOUT)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    job = get_job(job_id)
+    if process.exitcode != 0 and job is not None and job['status'] in (QUEUED, RUNNING):
+        # Killed (timeout, out of memory) before it could record anything
+        _update(job_id, status=FAILED, error=f'Export process exited with code {process.exitcode}',
+                finished_at=time.time())
+
+
+def _worker():
+    """Export thread: runs queued jobs one at a time
+
+    The thread only waits on its child process, so it costs the web worker
+    nothing while an export builds. Daemon threads and daemon children, so a
+    worker shutting down doesn't wait for its queue; unfinished jobs are left
+    to expire.
+    """
+    if _fork is None:
+        _lower_priority(threading.get_native_id())
+    while True:
+        job_id = _queue.get()
+        try:
+            _run(job_id)
+        except Exception as e:
+            # The job failed before it could record anything
+            _update(job_id, status=FAILED, error=f'Export failed: {e}', finished_at=time.time())
+        finally:
+            with _lock:
+                _pending.discard(job_id)
+
+
+def _start_workers():
+    """Start this web worker's export threads (call with _lock held)"""
+    while len(_threads) < EXPORT_WORKERS:
+        thread = threading.Thread(target=_worker, name=f'export-{len(_threads)}', daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def cleanup(max_age=EXPORT_TTL):
+    """Remove jobs older than max_age seconds"""
+    if not EXPORT_DIR.exists():
+        return
+    cutoff = time.time() - max_age
+    for job_dir in EXPORT_DIR.iterdir():
+        try:
+            if job_dir.is_dir() and job_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def validate(job_type, params):
+    """Normalized parameters for a job, or ExportError"""
+    if not isinstance(params, dict):
+        raise ExportError('Export parameters must be an object')
+
+    if job_type == 'artist':
+        artist_name = str(params.get('artist', '')).strip()
+        if not artist_name:
+            raise ExportError('Missing artist parameter')
+        return {'artist': artist_name}
+
+    if job_type == 'artists':
+        artists = params.get('artists') or []
+        if isinstance(artists, str):
+            artists = artists.split(',')
+        if not isinstance(artists, list) or not all(isinstance(a, str) for a in artists):
+            raise ExportError('artists must be a list of names')
+        artists = list(dict.fromkeys(a.strip() for a in artists if a and a.strip()))
+        if not artists:
+            raise ExportError('Missing artists parameter')
+        if len(artists) > MAX_BULK_ARTISTS:
+            raise ExportError(f'Too many artists (max {MAX_BULK_ARTISTS})')
+        return {'artists': artists}
+
+    if job_type == 'year':
+        chart_key = params.get('chart', 'hot100')
+        chart = CHARTS.get(chart_key) if isinstance(chart_key, str) else None
+        if chart is None or not chart.available:
+            raise ExportError('Chart data not available')
+        try:
+            year = int(params.get('year'))
+        except (TypeError, ValueError):
+            raise ExportError('Missing or invalid year parameter')
+        export_format = params.get('format', 'csv')
+        if export_format not in FORMATS:
+            raise ExportError(f'Unknown format: {export_format}')
+        return {'chart': chart_key, 'year': year, 'format': export_format}
+
+    raise ExportError(f'Unknown export type: {job_type}')
+
+
+def submit(job_type, params):
+    """Queue an export; returns the new job dict"""
+    params = validate(job_type, params)
+    with _lock:
+        if len(_pending) >= MAX_PENDING:
+            raise QueueFull('Too many exports in progress, try again shortly')
+
+    cleanup()
+    job_id = uuid.uuid4().hex
+    _job_dir(job_id).mkdir(parents=True, exist_ok=True)
+    job = {
+        'id': job_id,
+        'type': job_type,
+        'params': params,
+        'status': QUEUED,
+        'created_at': time.time(),
+        'filename': None,
+        'error': None,
+    }
+    _write_job(job)
+
+    with _lock:
+        _pending.add(job_id)
+        _start_workers()
+    _queue.put(job_id)
+    return job
+
+
+def wait(job_id, timeout):
+    """Job state once it finishes or timeout seconds pass (long polling)"""
+    deadline = time.time() + timeout
+    job = get_job(job_id)
+    while job is not None and job['status'] in (QUEUED, RUNNING) and time.time() < deadline:
+        time.sleep(0.2)
+        job = get_job(job_id)
+    return job
+
+
+def output_path(job):
+    """Path of a finished job's file"""
+    return _job_dir(job['id']) / job['filename']
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Image Proxy
+Fetches third-party artwork once, keeps it in a size-bounded on-disk cache and
+serves resized variants from /img/<size>/<token>
+"""
+import base64
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+# Variants the proxy will produce (px, square bounding box)
+IMAGE_SIZES = (64, 160, 600)
+
+CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', 'data/image_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_MB', '500')) * 1024 * 1024
+
+# Only these upstream hosts (or their subdomains) are proxied
+ALLOWED_HOSTS = [
+    h.strip() for h in os.environ.get(
+        'IMAGE_PROXY_HOSTS', 'mzstatic.com,wikimedia.org,scdn.co').split(',') if h.strip()
+]
+
+_lock = threading.Lock()
+_cache_bytes = None
+
+
+def encode_url(url):
+    """Opaque path token for an upstream URL"""
+    return base64.urlsafe_b64encode(url.encode()).decode().rstrip('=')
+
+
+def decode_url(token):
+    padded = token + '=' * (-len(token) % 4)
+    return base64.urlsafe_b64decode(padded.encode()).decode()
+
+
+def is_allowed(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return False
+    host = parsed.netloc.lower()
+    return any(host == allowed or host.endswith('.' + allowed) for allowed in ALLOWED_HOSTS)
+
+
+def proxy_urls(url):
+    """{size: local proxy path} for an upstream image URL, or None if not proxied"""
+    if not url or not is_allowed(url):
+        return None
+    token = encode_url(url)
+    return {str(size): f"/img/{size}/{token}" for size in IMAGE_SIZES}
+
+
+def _cache_path(url, size):
+    digest = hashlib.sha1(url.encode()).hexdigest()
+    return CACHE_DIR / digest[:2] / f"{digest}-{size}.img"
+
+
+def _current_cache_bytes():
+    global _cache_bytes
+    if _cache_bytes is None:
+        _cache_bytes = sum(p.stat().st_size for p in CACHE_DIR.rglob('*.img')) if CACHE_DIR.exists() else 0
+    return _cache_bytes
+
+
+def _store(path, data):
+    """Write a cache file, evicting least recently used files over the size budget"""
+    global _cache_bytes
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.tmp{os.getpid()}')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+    with _lock:
+        total = _current_cache_bytes() + len(data)
+        if total > CACHE_MAX_BYTES:
+            # Other workers write here too, so rescan rather than trust the counter
+            files = sorted(CACHE_DIR.rglob('*.img'), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            for old in files:
+                if total <= CACHE_MAX_BYTES * 0.9:
+                    break
+                if old == path:
+                    continue
+                try:
+                    size = old.stat().st_size
+                    old.unlink()
+                    total -= size
+                except OSError:
+                    pass
+        _cache_bytes = total
+
+
+def _read(path):
+    """Cached bytes (and bump mtime for LRU eviction), or None"""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+
+def resize(data, size):
+    """JPEG thumbnail within size x size; the original bytes if Pillow is unavailable"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    with Image.open(io.BytesIO(data)) as image:
+        if max(image.size) <= size:
+            return data
+        image = image.convert('RGB')
+        image.thumbnail((size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=85, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def fetch_original(url):
+    """Upstream image bytes, from the disk cache when possible"""
+    path = _cache_path(url, 'orig')
+    data = _read(path)
+    if data is None:
+        response = requests.get(url, timeout=10, headers={'User-Agent': 'BillboardAnalyzer/1.0'})
+        response.raise_for_status()
+        data = response.content
+        _store(path, data)
+    return data
+
+
+def get_image(url, size):
+    """Resized image bytes for an allowed upstream URL (fetched at most once)"""
+    path = _cache_path(url, size)
+    data = _read(path)
+    if data is None:
+        data = resize(fetch_original(url), size)
+        _store(path, data)
+    return data
+
+
+def sniff_mimetype(data):
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return 'application/octet-stream'
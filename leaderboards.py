@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+All-Time Leaderboards
+Top-K lists per chart, precomputed on load and updated as weeks are appended
+"""
+import copy
+import heapq
+import os
+import threading
+
+import numpy as np
+
+# How many entries each leaderboard keeps
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', '100'))
+
+BOARDS = {
+    'weeks_at_number_one': 'Most weeks at #1',
+    'longest_runs': 'Longest chart runs',
+    'biggest_jumps': 'Biggest single-week jumps',
+}
+
+
+class TopCounts:
+    """Bounded top-K of per-entry counters that only ever increase
+
+    Holds a full counter array plus a min-heap of the best K entries. Because
+    counts never go down, an entry outside the heap can only get in by beating
+    the current minimum, so each increment is O(log K) (O(K) when a member's
+    own score changes and the heap is re-ordered).
+    """
+
+    def __init__(self, size, counts):
+        self.size = size
+        self.counts = counts.astype(np.int64)
+        # Heap keys are (count, -entry): higher counts win, earlier entries win ties
+        order = np.lexsort((np.arange(len(counts)), -self.counts))[:size]
+        self.heap = [(int(self.counts[e]), -int(e)) for e in order if self.counts[e] > 0]
+        heapq.heapify(self.heap)
+        self.members = {-key[1] for key in self.heap}
+
+    def increment(self, entry):
+        if entry >= len(self.counts):
+            grown = np.zeros(max(entry + 1, len(self.counts) * 2), dtype=np.int64)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+        self.counts[entry] += 1
+        key = (int(self.counts[entry]), -entry)
+
+        if entry in self.members:
+            self.heap = [key if -k[1] == entry else k for k in self.heap]
+            heapq.heapify(self.heap)
+        elif len(self.heap) < self.size:
+            heapq.heappush(self.heap, key)
+            self.members.add(entry)
+        elif key > self.heap[0]:
+            evicted = heapq.heapreplace(self.heap, key)
+            self.members.discard(-evicted[1])
+            self.members.add(entry)
+
+    def top(self):
+        """[(entry, count)] best first"""
+        return [(-neg_entry, count) for count, neg_entry in sorted(self.heap, reverse=True)]
+
+
+class TopEvents:
+    """Bounded top-K of one-off events (e.g. a single week's jump)"""
+
+    def __init__(self, size, scores, rows):
+        self.size = size
+        # Heap keys are (score, -row): bigger scores win, earlier weeks win ties
+        order = np.lexsort((rows, -scores))[:size]
+        self.heap = [(int(scores[i]), -int(rows[i])) for i in order]
+        heapq.heapify(self.heap)
+
+    def add(self, score, row):
+        key = (int(score), -int(row))
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, key)
+        elif key > self.heap[0]:
+            heapq.heapreplace(self.heap, key)
+
+    def top(self):
+        """[(row, score)] best first"""
+        return [(-neg_row, score) for score, neg_row in sorted(self.heap, reverse=True)]
+
+
+class ChartLeaderboards:
+    """Leaderboards for one chart"""
+
+    def __init__(self, chart, size=LEADERBOARD_SIZE):
+        self.chart = chart
+        self.size = size
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.rebuild()
+
+    def rebuild(self):
+        """Compute every board from the full dataset (vectorized)"""
+        data = self.chart.data
+        entry = data['Entry'].to_numpy()
+        rank = data['Rank'].to_numpy()
+        last_week = data['Last Week'].to_numpy().astype(np.int32)
+        n_entries = int(entry.max()) + 1 if len(entry) else 0
+
+        # A row per entry to read names from
+        _, first_rows = np.unique(entry, return_index=True)
+
+        jumped = (last_week > 0) & (last_week > rank)
+        rows = np.flatnonzero(jumped)
+
+        with self._lock:
+            self.entry_row = dict(zip(range(n_entries), first_rows.tolist()))
+            self.number_ones = TopCounts(self.size, np.bincount(entry[rank == 1], minlength=n_entries))
+            self.runs = TopCounts(self.size, np.bincount(entry, minlength=n_entries))
+            self.jumps = TopEvents(self.size, (last_week - rank)[rows], rows)
+            self._cache = {}
+
+    def rebased(self, chart):
+        """Independent copy reading from chart (a newer state of the same chart)"""
+        return copy.deepcopy(self, {id(self.chart): chart, id(self._lock): threading.Lock()})
+
+    def add_week(self, pos):
+        """Fold one appended week (by week index) into every board"""
+        chart = self.chart
+        start, stop = int(chart.week_offsets[pos]), int(chart.week_offsets[pos + 1])
+        rows = chart.data.iloc[start:stop]
+
+        with self._lock:
+            for row, entry, rank, last_week in zip(
+                    range(start, stop), rows['Entry'], rows['Rank'], rows['Last Week']):
+                entry = int(entry)
+                self.entry_row.setdefault(entry, row)
+                self.runs.increment(entry)
+                if rank == 1:
+                    self.number_ones.increment(entry)
+                if 0 < last_week and rank < last_week:
+                    self.jumps.add(int(last_week) - int(rank), row)
+            self._cache = {}
+
+    def board(self, name):
+        """Formatted board, cached until the next update"""
+        cached = self._cache.get(name)
+        if cached is not None:
+            return cached
+
+        data = self.chart.data
+        with self._lock:
+            if name == 'biggest_jumps':
+                items = []
+                for row, jump in self.jumps.top():
+                    record = data.iloc[row]
+                    items.append({
+                        self.chart.item_label: record['Song'],
+                        'artist': record['Artist'],
+                        'date': record['Date'].strftime('%Y-%m-%d'),
+                        'from': int(record['Last Week']),
+                        'to': int(record['Rank']),
+                        'value': jump,
+                    })
+            else:
+                counts = self.number_ones if name == 'weeks_at_number_one' else self.runs
+                items = []
+                for entry, count in counts.top():
+                    record = data.iloc[self.entry_row[entry]]
+                    items.append({
+                        self.chart.item_label: record['Song'],
+                        'artist': record['Artist'],
+                        'value': count,
+                    })
+
+            for position, item in enumerate(items, start=1):
+                item['position'] = position
+            self._cache[name] = items
+        return items
+
+
+NAME = 'leaderboards'
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: rebuild on full loads, fold in appended weeks otherwise"""
+    boards = chart.previous_index(NAME) if first_new_week else None
+    if boards is None:
+        chart.derived[NAME] = ChartLeaderboards(chart)
+        return
+    for pos in range(first_new_week, len(chart.weeks)):
+        boards.add_week(pos)
+    chart.derived[NAME] = boards
+
+
+def track_charts(charts):
+    """Maintain leaderboards for every chart as it loads and refreshes"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def get_leaderboards(chart):
+    """Leaderboards for a loaded chart"""
+    derived = chart.load().derived
+    if NAME not in derived:
+        _on_chart_update(chart.snapshot(), 0)
+    return derived[NAME]
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Starts the app under gunicorn with stubbed iTunes/Wikipedia/image upstreams,
+replays a realistic traffic mix and reports throughput and latency per route.
+
+Usage:
+  python3 load_test.py --workers 2 --threads 4 --users 16 --duration 60
+  python3 load_test.py --upstream-latency 0.3 --mix autocomplete=50,artwork=50
+  python3 load_test.py --url http://127.0.0.1:5001   # test an already running app
+
+Compare runs with different --workers/--threads (or cache settings) before
+changing the Procfile. Each run starts with empty caches unless
+--payload-cache points at an existing one.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Relative weight of each user scenario
+DEFAULT_MIX = {
+    'autocomplete': 30,
+    'artwork': 25,
+    'browse': 20,
+    'history': 15,
+    'analyze': 7,
+    'download': 3,
+}
+
+
+# ---------------------------------------------------------------------------
+# Stub upstreams
+# ---------------------------------------------------------------------------
+
+def make_png(size, rgb=(200, 30, 30)):
+    """Solid-colour PNG (stdlib only) standing in for album artwork"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    row = b'\x00' + bytes(rgb) * size
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * size, 9))
+            + chunk(b'IEND', b''))
+
+
+def start_stub_server(latency):
+    """Serve iTunes search, Wikipedia summary and image requests locally
+
+    Returns (server, port). Artwork URLs point back at the same server.
+    """
+    image = make_png(600)
+    port = free_port()
+    image_base = f"http://127.0.0.1:{port}"
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path.startswith('/search'):
+                body = json.dumps({'resultCount': 1, 'results': [{
+                    'artworkUrl100': f"{image_base}/art/{abs(hash(self.path))}/100x100bb.png",
+                    'collectionName': 'Stub Album',
+                    'trackName': 'Stub Track',
+                    'artistName': 'Stub Artist',
+                }]}).encode()
+                content_type = 'application/json'
+            elif self.path.startswith('/summary/'):
+                body = json.dumps({
+                    'type': 'standard',
+                    'extract': 'A stub artist. Used for load testing. Not real.',
+                    'thumbnail': {'source': f"{image_base}/wiki/300px-stub.png"},
+                }).encode()
+                content_type = 'application/json'
+            else:
+                body = image
+                content_type = 'image/png'
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, port
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# ---------------------------------------------------------------------------
+# App under test
+# ---------------------------------------------------------------------------
+
+def start_app(args, stub_port, cache_dir):
+    """Run the app under gunicorn pointed at the stubs; returns (process, base_url)"""
+    port = free_port()
+    stub = f"http://127.0.0.1:{stub_port}"
+    env = dict(
+        os.environ,
+        ITUNES_SEARCH_URL=f"{stub}/search",
+        WIKIPEDIA_SUMMARY_URL=f"{stub}/summary/",
+        IMAGE_PROXY_HOSTS=f"127.0.0.1:{stub_port}",
+        # Every cache and shared directory lives in this run's temp dir, so runs
+        # start cold and are comparable (--payload-cache reuses a warm L2)
+        ARTWORK_CACHE_PATH=str(Path(cache_dir) / 'artwork_cache.sqlite3'),
+        IMAGE_CACHE_DIR=str(Path(cache_dir) / 'image_cache'),
+        PAYLOAD_CACHE_URL=args.payload_cache or f"sqlite:///{Path(cache_dir) / 'payload_cache.sqlite3'}",
+        SINGLEFLIGHT_LOCK_DIR=str(Path(cache_dir) / 'locks'),
+        EXPORT_DIR=str(Path(cache_dir) / 'exports'),
+        RATELIMIT_ENABLED='false',
+        AUTO_UPDATE_DATA='false',
+        WARM_CHARTS='all',
+        SPOTIPY_CLIENT_ID='',
+        SPOTIPY_CLIENT_SECRET='',
+    )
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:create_app()',
+        '--pythonpath', str(APP_DIR),
+        '--bind', f"127.0.0.1:{port}",
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--timeout', '120',
+        '--log-level', 'warning',
+    ]
+    print(f"🚀 Starting gunicorn ({args.workers} workers × {args.threads} threads) on port {port}...")
+    log = open(Path(cache_dir) / 'gunicorn.log', 'w')
+    process = subprocess.Popen(command, cwd=args.data_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_until_ready(base_url, timeout=180):
+    """Wait for the app to answer and finish loading chart data"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            response = requests.get(f"{base_url}/api/chart-range?start=2100-01-01", timeout=30)
+            if response.status_code == 200:
+                return response.json()
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"App at {base_url} did not become ready within {timeout}s")
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    """Thread-safe latency/status log per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append((seconds, ok))
+
+
+class Scenarios:
+    """User journeys; each records one sample per request it makes"""
+
+    def __init__(self, base_url, recorder, entries, weeks):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.entries = entries
+        self.artists = sorted({e['artist'] for e in entries})
+        self.weeks = weeks
+
+    def _request(self, session, route, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.base_url + path, timeout=60,
+                                       allow_redirects=False, **kwargs)
+            ok = response.status_code < 400 or response.status_code == 404
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.record(route, time.perf_counter() - started, ok)
+        return response
+
+    def autocomplete(self, session):
+        # One request per keystroke, like the search box
+        artist = random.choice(self.artists)
+        for length in range(1, min(len(artist), 6) + 1):
+            self._request(session, '/api/artists', 'GET', f"/api/artists?q={quote(artist[:length])}")
+
+    def analyze(self, session):
+        self._request(session, '/analyze', 'POST', '/analyze',
+                      data={'artist_name': random.choice(self.artists)})
+
+    def browse(self, session):
+        chart = 'hot100' if random.random() < 0.8 else 'billboard200'
+        self._request(session, f"/{chart}", 'GET', f"/{chart}?date={random.choice(self.weeks)}")
+
+    def history(self, session):
+        entry = random.choice(self.entries)
+        self._request(session, '/api/song-history', 'GET',
+                      f"/api/song-history?artist={quote(entry['artist'])}&song={quote(entry['song'])}")
+
+    def artwork(self, session):
+        entry = random.choice(self.entries)
+        response = self._request(
+            session, '/api/song-image', 'GET',
+            f"/api/song-image/{quote(entry['artist'], safe='')}/{quote(entry['song'], safe='')}")
+        if response is not None and response.status_code == 200:
+            urls = response.json().get('image_urls') or {}
+            if urls:
+                self._request(session, '/img', 'GET', urls['64'])
+
+    def download(self, session):
+        # Like a browser: follow the redirect, then reload the "preparing"
+        # page until the workbook is served; the sample is the whole wait
+        started = time.perf_counter()
+        try:
+            response = session.get(f"{self.base_url}/download/{quote(random.choice(self.artists))}",
+                                    headers={'Accept': 'text/html'}, timeout=60)
+            while response.status_code == 202:
+                time.sleep(float(response.headers.get('Retry-After', 1)))
+                response = session.get(response.url, headers={'Accept': 'text/html'}, timeout=60)
+            ok = response.status_code < 400 and 'attachment' in response.headers.get('Content-Disposition', '')
+        except requests.RequestException:
+            ok = False
+        self.recorder.record('/download', time.perf_counter() - started, ok)
+
+
+def run_users(scenarios, mix, users, duration):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.time() + duration
+
+    def user():
+        session = requests.Session()
+        while time.time() < deadline:
+            getattr(scenarios, random.choices(names, weights)[0])(session)
+
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, duration):
+    report = {}
+    for route, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds for seconds, _ in samples)
+        report[route] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'rps': round(len(samples) / duration, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        }
+    return report
+
+
+def print_report(report, duration):
+    print(f"\n{'route':<20} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print('-' * 75)
+    for route, row in report.items():
+        print(f"{route:<20} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    total = sum(row['requests'] for row in report.values())
+    errors = sum(row['errors'] for row in report.values())
+    print('-' * 75)
+    print(f"{'total':<20} {total:>9} {errors:>7} {round(total / duration, 2):>8}")
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        mix = {}
+        for part in text.split(','):
+            name, _, weight = part.partition('=')
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown scenario '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+            mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the app with stubbed upstream APIs')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--users', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of traffic')
+    parser.add_argument('--upstream-latency', type=float, default=0.15,
+                        help='seconds each stubbed iTunes/Wikipedia/image request takes')
+    parser.add_argument('--mix', help='scenario weights, e.g. autocomplete=30,artwork=25')
+    parser.add_argument('--data-dir', default=str(APP_DIR), help='directory holding the chart CSVs')
+    parser.add_argument('--url', help='test an already running app instead of starting gunicorn')
+    parser.add_argument('--payload-cache',
+                        help='payload cache L2 URL to use instead of a fresh one per run (e.g. a warm sqlite:///path)')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    print("=" * 60)
+    print("Billboard Load Test")
+    print("=" * 60)
+
+    process = None
+    cache_dir = tempfile.mkdtemp(prefix='billboard-loadtest-')
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            _, stub_port = start_stub_server(args.upstream_latency)
+            print(f"🧪 Stub upstreams on port {stub_port} ({args.upstream_latency * 1000:.0f} ms latency)")
+            process, base_url = start_app(args, stub_port, cache_dir)
+
+        print("⏳ Waiting for the app to load chart data...")
+        latest = wait_until_ready(base_url)
+        entries = [e for week in latest['weeks'] for e in week['entries']]
+        weeks = requests.get(f"{base_url}/api/chart-range?start=1990-01-01&end=1994-12-31",
+                             timeout=60).json().get('weeks', [])
+        week_dates = [w['date'] for w in weeks] or [latest['end']]
+        print(f"✓ Ready: {len(entries)} entries, {len(week_dates)} weeks to browse")
+
+        recorder = Recorder()
+        scenarios = Scenarios(base_url, recorder, entries, week_dates)
+        print(f"📈 {args.users} users for {args.duration:.0f}s, mix: "
+              + ', '.join(f"{name}={weight:g}" for name, weight in mix.items()))
+        started = time.time()
+        run_users(scenarios, mix, args.users, args.duration)
+        elapsed = time.time() - started
+
+        report = summarize(recorder, elapsed)
+        print_report(report, elapsed)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({
+                    'workers': args.workers, 'threads': args.threads, 'users': args.users,
+                    'duration': elapsed, 'upstream_latency': args.upstream_latency,
+                    'mix': mix, 'routes': report,
+                }, f, indent=2)
+            print(f"\n📝 Report written to {args.json}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Weekly Movers
+Event table of debuts, re-entries, gainers, fallers and exits for every chart
+week, built once with vectorized operations and indexed by week
+"""
+import copy
+import threading
+
+import numpy as np
+
+# Event types, in the order they are stored within each week
+DEBUT, REENTRY, GAINER, FALLER, EXIT = range(5)
+EVENT_NAMES = ('debuts', 're_entries', 'gainers', 'fallers', 'exits')
+N_TYPES = len(EVENT_NAMES)
+
+
+class MoverIndex:
+    """Per-chart event table sorted by (week, type, importance)
+
+    Each event has a week index, a type, the data row it refers to (for exits,
+    the entry's last row on the chart) and the previous rank where relevant.
+    offsets[week * N_TYPES + type] is where that week's events of that type
+    start, so a lookup is two array reads and a slice.
+    """
+
+    def __init__(self, chart):
+        self.chart = chart
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    def _row_arrays(self):
+        data = self.chart.data
+        offsets = self.chart.week_offsets
+        week = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+        return week, data['Entry'].to_numpy(), data['Rank'].to_numpy().astype(np.int32)
+
+    def rebuild(self):
+        """Build the whole event table from scratch (vectorized)"""
+        week, entry, rank = self._row_arrays()
+        n_weeks = len(self.chart.weeks)
+        n_entries = int(entry.max()) + 1 if len(entry) else 0
+
+        # Order rows by entry, then week, so shift() gives each entry's previous week
+        order = np.lexsort((week, entry))
+        e, w, r = entry[order], week[order], rank[order]
+        same_prev = np.r_[False, e[1:] == e[:-1]]
+        prev_w = np.r_[-1, w[:-1]]
+        prev_r = np.r_[0, r[:-1]]
+
+        consecutive = same_prev & (prev_w == w - 1)
+        types = np.full(len(order), GAINER, dtype=np.int8)
+        types[~same_prev] = DEBUT
+        types[same_prev & ~consecutive] = REENTRY
+        types[consecutive & (r > prev_r)] = FALLER
+        steady = consecutive & (r == prev_r)
+
+        # An entry exits the week after any appearance not followed by the next week
+        same_next = np.r_[e[1:] == e[:-1], False]
+        next_w = np.r_[w[1:], -1]
+        exits = ~(same_next & (next_w == w + 1)) & (w + 1 < n_weeks)
+
+        keep = ~steady
+        event_week = np.concatenate([w[keep], w[exits] + 1])
+        event_type = np.concatenate([types[keep], np.full(int(exits.sum()), EXIT, dtype=np.int8)])
+        event_row = np.concatenate([order[keep], order[exits]]).astype(np.int32)
+        event_prev = np.concatenate([
+            np.where(consecutive, prev_r, 0)[keep], r[exits]]).astype(np.int16)
+        event_rank = np.concatenate([r[keep], np.zeros(int(exits.sum()), dtype=np.int32)])
+
+        # Entry state for incremental updates: last week seen and rank then
+        last_week = np.full(n_entries, -1, dtype=np.int32)
+        last_rank = np.zeros(n_entries, dtype=np.int32)
+        last = ~same_next
+        last_week[e[last]] = w[last]
+        last_rank[e[last]] = r[last]
+
+        with self._lock:
+            self._set_events(event_week, event_type, event_row, event_prev, event_rank, n_weeks)
+            self.last_week = last_week
+            self.last_rank = last_rank
+
+    def _importance(self, event_type, prev, rank):
+        """Sort key within a (week, type) group - smaller comes first"""
+        key = rank.astype(np.int32)                        # debuts/re-entries: best rank first
+        key = np.where(event_type == GAINER, -(prev - rank), key)   # biggest climb first
+        key = np.where(event_type == FALLER, -(rank - prev), key)   # biggest drop first
+        key = np.where(event_type == EXIT, prev, key)                # best final position first
+        return key
+
+    def _set_events(self, week, event_type, row, prev, rank, n_weeks):
+        order = np.lexsort((row, self._importance(event_type, prev.astype(np.int32), rank), event_type, week))
+        self.event_week = week[order]
+        self.event_type = event_type[order]
+        self.event_row = row[order]
+        self.event_prev = prev[order]
+        groups = self.event_week.astype(np.int64) * N_TYPES + self.event_type
+        counts = np.bincount(groups, minlength=n_weeks * N_TYPES)
+        self.offsets = np.r_[0, np.cumsum(counts)]
+
+    def rebased(self, chart):
+        """Independent copy reading from chart (a newer state of the same chart)"""
+        return copy.deepcopy(self, {id(self.chart): chart, id(self._lock): threading.Lock()})
+
+    def add_week(self, pos):
+        """Fold one appended week (by week index) into the event table"""
+        chart = self.chart
+        start, stop = int(chart.week_offsets[pos]), int(chart.week_offsets[pos + 1])
+        entry = chart.data['Entry'].to_numpy()[start:stop]
+        rank = chart.data['Rank'].to_numpy()[start:stop].astype(np.int32)
+        rows = np.arange(start, stop, dtype=np.int32)
+
+        with self._lock:
+            n_entries = int(entry.max()) + 1 if len(entry) else 0
+            if n_entries > len(self.last_week):
+                grow = n_entries - len(self.last_week)
+                self.last_week = np.r_[self.last_week, np.full(grow, -1, dtype=np.int32)]
+                self.last_rank = np.r_[self.last_rank, np.zeros(grow, dtype=np.int32)]
+
+            seen_week = self.last_week[entry]
+            prev_rank = self.last_rank[entry]
+            consecutive = seen_week == pos - 1
+            types = np.full(len(entry), GAINER, dtype=np.int8)
+            types[seen_week < 0] = DEBUT
+            types[(seen_week >= 0) & ~consecutive] = REENTRY
+            types[consecutive & (rank > prev_rank)] = FALLER
+            keep = ~(consecutive & (rank == prev_rank))
+
+            # Exits: on last week's chart but not on this one
+            prev_start, prev_stop = int(chart.week_offsets[pos - 1]), start
+            prev_entry = chart.data['Entry'].to_numpy()[prev_start:prev_stop]
+            gone = ~np.isin(prev_entry, entry)
+            exit_rows = np.arange(prev_start, prev_stop, dtype=np.int32)[gone]
+            exit_prev = chart.data['Rank'].to_numpy()[exit_rows].astype(np.int16)
+
+            new_type = np.r_[types[keep], np.full(len(exit_rows), EXIT, dtype=np.int8)]
+            new_row = np.r_[rows[keep], exit_rows].astype(np.int32)
+            new_prev = np.r_[np.where(consecutive, prev_rank, 0)[keep], exit_prev].astype(np.int16)
+            new_rank = np.r_[rank[keep], np.zeros(len(exit_rows), dtype=np.int32)]
+
+            order = np.lexsort((new_row, self._importance(new_type, new_prev.astype(np.int32), new_rank), new_type))
+            self.event_week = np.r_[self.event_week, np.full(len(order), pos, dtype=self.event_week.dtype)]
+            self.event_type = np.r_[self.event_type, new_type[order]]
+            self.event_row = np.r_[self.event_row, new_row[order]]
+            self.event_prev = np.r_[self.event_prev, new_prev[order]]
+            counts = np.bincount(new_type, minlength=N_TYPES)
+            self.offsets = np.r_[self.offsets, self.offsets[-1] + np.cumsum(counts)]
+
+            self.last_week[entry] = pos
+            self.last_rank[entry] = rank
+
+    def week_movers(self, pos, limit=10):
+        """Top `limit` events of each type for week index pos"""
+        data = self.chart.data
+        label = self.chart.item_label
+        result = {}
+        for event_type, name in enumerate(EVENT_NAMES):
+            key = pos * N_TYPES + event_type
+            start = self.offsets[key]
+            stop = min(self.offsets[key + 1], start + limit)
+            items = []
+            for i in range(start, stop):
+                record = data.iloc[int(self.event_row[i])]
+                prev = int(self.event_prev[i]) or None
+                item = {label: record['Song'], 'artist': record['Artist']}
+                if event_type == EXIT:
+                    item['last_rank'] = prev
+                else:
+                    item['rank'] = int(record['Rank'])
+                    item['last_week'] = prev
+                    if prev:
+                        item['change'] = prev - int(record['Rank'])
+                items.append(item)
+            result[name] = items
+        return result
+
+
+NAME = 'movers'
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: rebuild on full loads, append events for new weeks otherwise"""
+    index = chart.previous_index(NAME) if first_new_week else None
+    if index is None:
+        chart.derived[NAME] = MoverIndex(chart)
+        return
+    for pos in range(first_new_week, len(chart.weeks)):
+        index.add_week(pos)
+    chart.derived[NAME] = index
+
+
+def track_charts(charts):
+    """Maintain mover indexes for every chart as it loads and refreshes"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def get_movers(chart):
+    """Mover index for a loaded chart"""
+    derived = chart.load().derived
+    if NAME not in derived:
+        _on_chart_update(chart.snapshot(), 0)
+    return derived[NAME]
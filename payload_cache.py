@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Payload Cache
+Two-tier cache for computed analytics payloads (results pages, artist info,
+chart weeks, histories):
+
+  L1 - bounded in-process LRU, per worker
+  L2 - shared by all workers: Redis, or a SQLite file when Redis isn't set up
+
+Keys include the chart's dataset version, so a data refresh invalidates every
+cached payload for that chart at once; stale L2 entries simply expire. Misses
+go through singleflight, so one worker computes while the others wait for L2.
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import singleflight
+
+# L2 backend: redis://..., sqlite:///path, or "none" for L1 only
+# (defaults to REDIS_URL when the platform provides one)
+CACHE_URL = os.environ.get('PAYLOAD_CACHE_URL') or os.environ.get('REDIS_URL') \
+    or 'sqlite:///data/payload_cache.sqlite3'
+# Payloads kept in each worker's L1, seconds entries live in L2, and the
+# largest payload (encoded bytes) written to L2
+L1_SIZE = int(os.environ.get('PAYLOAD_CACHE_SIZE', '512'))
+L2_TTL = int(os.environ.get('PAYLOAD_CACHE_TTL', '86400'))
+L2_MAX_BYTES = int(os.environ.get('PAYLOAD_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+
+KEY_PREFIX = 'payload'
+
+_l1 = OrderedDict()
+_lock = threading.Lock()
+_metrics = {}
+_backend = None
+_backend_ready = False
+
+
+def _json_default(value):
+    # numpy scalars from pandas reductions
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class RedisBackend:
+    """L2 in Redis (shared across workers and instances)"""
+
+    def __init__(self, url):
+        import redis
+        self.errors = (redis.RedisError, OSError)
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        try:
+            return self.client.get(key)
+        except self.errors as e:
+            print(f"⚠️  Payload cache read failed: {e}")
+            return None
+
+    def set(self, key, data):
+        try:
+            self.client.set(key, data, ex=L2_TTL)
+        except self.errors as e:
+            print(f"⚠️  Payload cache write failed: {e}")
+
+
+class SQLiteBackend:
+    """L2 in a local SQLite file (shared across workers on one machine)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS payloads (
+                    key TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._connection().execute(
+                'SELECT data FROM payloads WHERE key=? AND expires_at > ?', (key, time.time())).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Payload cache read failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def set(self, key, data):
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute('INSERT OR REPLACE INTO payloads (key, data, expires_at) VALUES (?, ?, ?)',
+                         (key, data, now + L2_TTL))
+            # Occasionally drop expired entries (old dataset versions end up here)
+            if random.random() < 0.01:
+                conn.execute('DELETE FROM payloads WHERE expires_at <= ?', (now,))
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Payload cache write failed: {e}")
+            self._rollback()
+
+    def _rollback(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+
+
+def open_backend(url):
+    """L2 backend for a cache URL, or None"""
+    if not url or url == 'none':
+        return None
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    return SQLiteBackend(url)
+
+
+def backend():
+    """The configured L2 backend (created on first use), or None"""
+    global _backend, _backend_ready
+    if not _backend_ready:
+        with _lock:
+            if not _backend_ready:
+                try:
+                    _backend = open_backend(CACHE_URL)
+                except ImportError as e:
+                    print(f"⚠️  Payload cache L2 not available ({e}) - using L1 only")
+                _backend_ready = True
+    return _backend
+
+
+def _count(route, tier):
+    with _lock:
+        counts = _metrics.setdefault(route, {'l1': 0, 'l2': 0, 'miss': 0})
+        counts[tier] += 1
+
+
+def _l1_put(key, value):
+    with _lock:
+        _l1[key] = value
+        _l1.move_to_end(key)
+        while len(_l1) > L1_SIZE:
+            _l1.popitem(last=False)
+
+
+def _l2_get(key):
+    """(hit, value) from L2"""
+    l2 = backend()
+    data = l2.get(key) if l2 is not None else None
+    if data is None:
+        return False, None
+    return True, json.loads(data)['v']
+
+
+def cache_key(route, chart, params):
+    digest = hashlib.sha1(json.dumps(list(params), default=str).encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:{chart.key}:{chart.version}:{route}:{digest}"
+
+
+def cached(route, chart, params, compute):
+    """compute() for route/params on a chart, via L1 then L2 (None results are cached too)
+
+    params must be normalized by the caller (e.g. lower-cased names) and
+    JSON-serializable; payloads must be JSON-serializable.
+    """
+    chart.load()
+    key = cache_key(route, chart, params)
+
+    with _lock:
+        hit = key in _l1
+        if hit:
+            _l1.move_to_end(key)
+            value = _l1[key]
+    if hit:
+        _count(route, 'l1')
+        return value
+
+    hit, value = _l2_get(key)
+    if hit:
+        _l1_put(key, value)
+        _count(route, 'l2')
+        return value
+
+    def compute_and_store():
+        value = compute()
+        l2 = backend()
+        if l2 is not None:
+            data = json.dumps({'v': value}, default=_json_default, separators=(',', ':'))
+            if len(data) <= L2_MAX_BYTES:
+                l2.set(key, data)
+        return value
+
+    _count(route, 'miss')
+    value = singleflight.do(key, compute_and_store, lambda: _l2_get(key), shared=backend() is not None)
+    _l1_put(key, value)
+    return value
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: drop this chart's L1 entries (their keys name the old version)"""
+    prefix = f"{KEY_PREFIX}:{chart.key}:"
+    with _lock:
+        for key in [k for k in _l1 if k.startswith(prefix)]:
+            del _l1[key]
+
+
+def track_charts(charts):
+    """Free L1 space as soon as a chart loads or refreshes"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def stats():
+    """Per-route L1/L2 hits, misses and hit ratio for this worker"""
+    with _lock:
+        routes = {}
+        for route, counts in sorted(_metrics.items()):
+            total = sum(counts.values())
+            routes[route] = dict(counts, requests=total,
+                                 hit_ratio=round((counts['l1'] + counts['l2']) / total, 4) if total else None)
+        l1_entries = len(_l1)
+    l2 = backend()
+    return {
+        'backend': type(l2).__name__ if l2 is not None else None,
+        'l1_entries': l1_entries,
+        'l1_size': L1_SIZE,
+        'routes': routes,
+    }
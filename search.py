@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Global Search
+Typo-tolerant search over songs, albums and artists using a trigram index
+"""
+import re
+import time
+import unicodedata
+
+import numpy as np
+
+# Documents must share at least this similarity with the query to be returned
+MIN_SIMILARITY = 0.3
+# How much chart popularity (weeks charted) can lift a result's score
+POPULARITY_WEIGHT = 0.25
+# Longest query that is indexed (keeps query time bounded)
+MAX_QUERY_LENGTH = 64
+
+KIND_ARTIST = 'artist'
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r'[^0-9a-z]+', ' ', text.lower()).strip()
+
+
+def trigrams(text):
+    """Set of padded trigrams for normalized text ("  dr", " dra", ...)"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted trigram index over one chart's entries and artists"""
+
+    def __init__(self, chart):
+        self.chart_key = chart.key
+        self.item_label = chart.item_label
+        data = chart.data
+
+        # One document per chart entry (song/album), popularity = weeks charted
+        entry = data['Entry'].to_numpy()
+        _, first_rows, entry_weeks = np.unique(entry, return_index=True, return_counts=True)
+        items = data.iloc[first_rows]
+        names = items['Song'].astype(str).tolist()
+        artists = items['Artist'].astype(str).tolist()
+        kinds = [self.item_label] * len(names)
+        popularity = entry_weeks.tolist()
+
+        # One document per artist credit, popularity = total weeks charted
+        artist_codes = data['Artist'].cat.codes.to_numpy()
+        artist_weeks = np.bincount(artist_codes, minlength=len(data['Artist'].cat.categories))
+        for name, weeks in zip(data['Artist'].cat.categories, artist_weeks):
+            if weeks and name:
+                names.append(name)
+                artists.append(name)
+                kinds.append(KIND_ARTIST)
+                popularity.append(int(weeks))
+
+        self.names = names
+        self.artists = artists
+        self.kinds = kinds
+        self.kind_array = np.asarray(kinds)
+        self.popularity = np.log1p(np.asarray(popularity, dtype=np.float64))
+        self.popularity /= max(self.popularity.max(initial=0.0), 1.0)
+
+        postings = {}
+        sizes = np.zeros(len(names), dtype=np.int32)
+        for doc, name in enumerate(names):
+            grams = trigrams(normalize(name))
+            sizes[doc] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc)
+        self.sizes = sizes
+        self.postings = {gram: np.asarray(docs, dtype=np.int32) for gram, docs in postings.items()}
+
+    def search(self, query_grams, limit, kinds=None):
+        """[(score, similarity, doc)] for the best matches of a trigram set"""
+        lists = [self.postings[g] for g in query_grams if g in self.postings]
+        if not lists:
+            return []
+
+        # Shared trigram count per candidate document
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+
+        # Blend of containment (typed prefixes match) and Jaccard (full names match)
+        query_size = len(query_grams)
+        jaccard = shared / (query_size + self.sizes[candidates] - shared)
+        containment = shared / query_size
+        similarity = 0.6 * containment + 0.4 * jaccard
+
+        keep = similarity >= MIN_SIMILARITY
+        if kinds:
+            keep &= np.isin(self.kind_array[candidates], list(kinds))
+        candidates, similarity = candidates[keep], similarity[keep]
+        if not len(candidates):
+            return []
+
+        score = similarity * (1 + POPULARITY_WEIGHT * self.popularity[candidates])
+        top = np.argsort(-score, kind='stable')[:limit]
+        return [(float(score[i]), float(similarity[i]), int(candidates[i])) for i in top]
+
+    def document(self, doc, score, similarity):
+        kind = self.kinds[doc]
+        result = {
+            'type': kind,
+            'name': self.names[doc],
+            'chart': self.chart_key,
+            'score': round(score, 4),
+            'similarity': round(similarity, 4),
+        }
+        if kind != KIND_ARTIST:
+            result['artist'] = self.artists[doc]
+        return result
+
+
+NAME = 'search'
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: (re)build the chart's trigram index"""
+    started = time.time()
+    index = TrigramIndex(chart)
+    chart.derived[NAME] = index
+    print(f"✓ Search index for {chart.title}: {len(index.names)} documents "
+          f"in {time.time() - started:.1f}s")
+
+
+def track_charts(charts):
+    """Build search indexes as charts load and refresh"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def search(charts, query, limit=20, kinds=None):
+    """Search the given charts (loading them if needed); artists are merged across charts"""
+    text = normalize(query)[:MAX_QUERY_LENGTH]
+    if not text:
+        return []
+    query_grams = trigrams(text)
+
+    results = []
+    for chart in charts.values():
+        if not chart.available:
+            continue
+        derived = chart.load().derived
+        if NAME not in derived:
+            _on_chart_update(chart.snapshot(), 0)
+        index = derived[NAME]
+        for score, similarity, doc in index.search(query_grams, limit, kinds):
+            results.append(index.document(doc, score, similarity))
+
+    # The same artist can chart on several charts - keep their best match
+    merged = {}
+    for result in results:
+        if result['type'] == KIND_ARTIST:
+            key = (KIND_ARTIST, result['name'].lower())
+        else:
+            key = (result['type'], result['name'].lower(), result['artist'].lower())
+        if key not in merged or result['score'] > merged[key]['score']:
+            merged[key] = result
+
+    ranked = sorted(merged.values(), key=lambda r: r['score'], reverse=True)
+    return ranked[:limit]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Artist Similarity
+"Charted alongside" and "similar trajectory" neighbours from a sparse
+artist x week incidence matrix, precomputed per chart on load
+"""
+import os
+import re
+
+import numpy as np
+
+# Neighbours kept per artist, and the fewest chart weeks a neighbour needs
+SIMILAR_TOP_K = int(os.environ.get('SIMILAR_TOP_K', '20'))
+MIN_NEIGHBOUR_WEEKS = 4
+
+# Credits are split into individual artists on these joiners only ("&" and ","
+# are left alone - they are usually part of a duo or band name)
+CREDIT_SPLIT = re.compile(r'\s+(?:featuring|feat\.?|ft\.?|with|x|vs\.?)\s+', re.IGNORECASE)
+
+
+def split_credit(credit):
+    """Individual artists named in a chart credit"""
+    return [name.strip() for name in CREDIT_SPLIT.split(str(credit)) if name.strip()]
+
+
+def _top_k(matrix, k, eligible):
+    """Best k columns per row of a CSR matrix, skipping the diagonal
+
+    Returns (indices, scores) arrays of shape (rows, k); unused slots are -1/0.
+    """
+    n = matrix.shape[0]
+    indices = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    indptr, cols, values = matrix.indptr, matrix.indices, matrix.data
+    for row in range(n):
+        start, stop = indptr[row], indptr[row + 1]
+        row_cols, row_values = cols[start:stop], values[start:stop]
+        keep = (row_cols != row) & eligible[row_cols]
+        row_cols, row_values = row_cols[keep], row_values[keep]
+        if len(row_cols) > k:
+            best = np.argpartition(-row_values, k - 1)[:k]
+            row_cols, row_values = row_cols[best], row_values[best]
+        order = np.lexsort((row_cols, -row_values))
+        indices[row, :len(order)] = row_cols[order]
+        scores[row, :len(order)] = row_values[order]
+    return indices, scores
+
+
+class ArtistSimilarity:
+    """Top-K co-charting and trajectory neighbours for every artist on a chart
+
+    Rows of the incidence matrix are artists (credits split into individual
+    names), columns are chart weeks. Co-occurrence counts come from B @ B.T on
+    the binary matrix; trajectory similarity is the cosine of rank-weighted
+    rows (points = chart size + 1 - rank). Only the top-K of each is kept.
+    """
+
+    def __init__(self, chart, k=SIMILAR_TOP_K):
+        from scipy import sparse
+
+        data = chart.data
+        self.k = k
+
+        # Credit -> artist ids, as flat arrays (one entry per credited artist)
+        credits = data['Artist'].cat.categories
+        ids = {}
+        names = []
+        credit_artists = []
+        credit_counts = np.zeros(len(credits), dtype=np.int64)
+        for code, credit in enumerate(credits):
+            for name in split_credit(credit):
+                key = name.lower()
+                if key not in ids:
+                    ids[key] = len(names)
+                    names.append(name)
+                credit_artists.append(ids[key])
+                credit_counts[code] += 1
+        credit_artists = np.asarray(credit_artists, dtype=np.int32)
+        credit_starts = np.r_[0, np.cumsum(credit_counts)[:-1]]
+
+        # One (artist, week, points) triple per credited artist per chart row
+        codes = data['Artist'].cat.codes.to_numpy()
+        week = np.repeat(np.arange(len(chart.weeks), dtype=np.int32), np.diff(chart.week_offsets))
+        rank = data['Rank'].to_numpy().astype(np.float32)
+        repeats = credit_counts[codes]
+        row = np.repeat(np.arange(len(data)), repeats)
+        within = np.arange(len(row)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        artist = credit_artists[credit_starts[codes[row]] + within]
+        points = rank.max(initial=0) + 1 - rank[row]
+
+        shape = (len(names), len(chart.weeks))
+        weighted = sparse.csr_matrix((points, (artist, week[row])), shape=shape, dtype=np.float32)
+        incidence = weighted.copy()
+        incidence.data[:] = 1
+        incidence = incidence.astype(np.float32)
+
+        weeks_charted = np.asarray(incidence.sum(axis=1)).ravel().astype(np.int32)
+        eligible = weeks_charted >= MIN_NEIGHBOUR_WEEKS
+
+        # Co-occurrence: weeks both artists were on the chart
+        together = (incidence @ incidence.T).tocsr()
+        self.alongside, self.alongside_weeks = _top_k(together, k, eligible)
+        del together
+
+        # Cosine similarity of rank-weighted week vectors
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        normalized = sparse.diags(1 / np.maximum(norms, 1e-9)) @ weighted
+        cosine = (normalized @ normalized.T).tocsr()
+        self.trajectory, self.trajectory_scores = _top_k(cosine, k, eligible)
+        del cosine
+
+        self.names = names
+        self.ids = ids
+        self.weeks_charted = weeks_charted
+        self.nnz = weighted.nnz
+
+    def artist_id(self, name):
+        """Artist id for a name or credit (its first artist), or None"""
+        artist_id = self.ids.get(name.strip().lower())
+        if artist_id is None:
+            parts = split_credit(name)
+            artist_id = self.ids.get(parts[0].lower()) if parts else None
+        return artist_id
+
+    def neighbours(self, artist_id, limit=10):
+        """Both neighbour lists for one artist (two array reads)"""
+        alongside = [
+            {'artist': self.names[j], 'weeks': int(w)}
+            for j, w in zip(self.alongside[artist_id, :limit], self.alongside_weeks[artist_id, :limit])
+            if j >= 0
+        ]
+        trajectory = [
+            {'artist': self.names[j], 'score': round(float(s), 4)}
+            for j, s in zip(self.trajectory[artist_id, :limit], self.trajectory_scores[artist_id, :limit])
+            if j >= 0
+        ]
+        return {
+            'artist': self.names[artist_id],
+            'weeks': int(self.weeks_charted[artist_id]),
+            'charted_alongside': alongside,
+            'similar_trajectory': trajectory,
+        }
+
+
+NAME = 'similarity'
+
+
+def _on_chart_update(chart, first_new_week):
+    """Chart listener: rebuild the matrices whenever the chart changes"""
+    chart.derived[NAME] = ArtistSimilarity(chart)
+
+
+def track_charts(charts):
+    """Maintain similarity neighbours for every chart as it loads and refreshes"""
+    for chart in charts.values():
+        chart.subscribe(_on_chart_update)
+
+
+def get_similarity(chart):
+    """Similarity index for a loaded chart"""
+    derived = chart.load().derived
+    if NAME not in derived:
+        _on_chart_update(chart.snapshot(), 0)
+    return derived[NAME]
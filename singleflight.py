@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Calls
+Coalesces concurrent identical work: while a call for a key is running, other
+callers with the same key wait for its result instead of repeating it.
+
+Within a worker this is an in-memory table of in-flight calls. With shared=True
+the leader also takes a file lock next to the shared cache, so only one worker
+runs the call; workers that waited on the lock re-check the shared cache
+(lookup) before doing anything themselves.
+"""
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays per worker
+    fcntl = None
+
+# Lock files for cross-worker coalescing (SINGLEFLIGHT_LOCKS=false turns it off)
+LOCK_DIR = Path(os.environ.get('SINGLEFLIGHT_LOCK_DIR', 'data/locks'))
+CROSS_WORKER = os.environ.get('SINGLEFLIGHT_LOCKS', 'true').lower() != 'false' and fcntl is not None
+# Lock files unused for this long are removed, checked at most this often
+LOCK_MAX_AGE = 3600
+SWEEP_SECONDS = 600
+# Longest a caller waits on someone else's call before running it itself
+WAIT_SECONDS = float(os.environ.get('SINGLEFLIGHT_WAIT_SECONDS', '30'))
+
+_flights = {}
+_lock = threading.Lock()
+_last_sweep = 0.0
+_stats = {'calls': 0, 'coalesced': 0, 'shared_hits': 0}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _lock_path(key):
+    # One file per key (two keys never wait on each other), fanned out over
+    # 256 subdirectories
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return LOCK_DIR / digest[:2] / f'{digest}.lock'
+
+
+class _FileLock:
+    """Exclusive flock on the key's lock file, given up after timeout seconds"""
+
+    def __init__(self, key, timeout):
+        self.path = _lock_path(key)
+        self.timeout = timeout
+        self.file = None
+        self.waited = False
+
+    def _open(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            return open(self.path, 'a')
+        except OSError:
+            return None
+
+    def __enter__(self):
+        self.file = self._open()
+        deadline = time.time() + self.timeout
+        while self.file is not None:
+            try:
+                fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.waited = True
+                if time.time() >= deadline:
+                    # Holder is stuck or very slow - go ahead without the lock
+                    self.file.close()
+                    self.file = None
+                    return self
+                time.sleep(0.05)
+                continue
+            try:
+                current = os.stat(self.path).st_ino
+            except OSError:
+                current = None
+            if current == os.fstat(self.file.fileno()).st_ino:
+                # Mark the file as in use for the sweep
+                os.utime(self.file.fileno())
+                return self
+            # Swept between our open and flock - lock the file now at the path
+            self.file.close()
+            self.file = self._open()
+        return self
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+
+
+def _sweep(max_age=LOCK_MAX_AGE):
+    """Remove lock files nobody has used for max_age seconds
+
+    A file is only removed while this process holds its lock, and lockers
+    re-check the path after locking, so nobody ends up holding a lock on a
+    removed file.
+    """
+    cutoff = time.time() - max_age
+    for path in LOCK_DIR.glob('*/*.lock'):
+        try:
+            if path.stat().st_mtime >= cutoff:
+                continue
+            with open(path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if os.fstat(f.fileno()).st_mtime < cutoff:
+                    path.unlink()
+        except (BlockingIOError, FileNotFoundError):
+            continue
+        except OSError:
+            return
+
+
+def _maybe_sweep():
+    """Sweep old lock files at most every SWEEP_SECONDS, in the background"""
+    global _last_sweep
+    with _lock:
+        now = time.time()
+        if now - _last_sweep < SWEEP_SECONDS:
+            return
+        _last_sweep = now
+    threading.Thread(target=_sweep, name='singleflight-sweep', daemon=True).start()
+
+
+def _run(key, fn, lookup, shared):
+    if not (shared and CROSS_WORKER):
+        return fn()
+    _maybe_sweep()
+    with _FileLock(key, WAIT_SECONDS) as lock:
+        # Another worker may have finished the same call while we waited
+        if lock.waited and lookup is not None:
+            hit, value = lookup()
+            if hit:
+                with _lock:
+                    _stats['shared_hits'] += 1
+                return value
+        return fn()
+
+
+def do(key, fn, lookup=None, shared=False):
+    """fn() for key, run at most once at a time; concurrent callers share the result
+
+    Keys should include everything the result depends on (normalized
+    parameters, dataset version). lookup() -> (hit, value) reads the shared
+    cache fn() fills; it is used with shared=True after waiting on another
+    worker. Exceptions from fn() are re-raised in every waiting caller.
+    """
+    with _lock:
+        _stats['calls'] += 1
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+        else:
+            _stats['coalesced'] += 1
+
+    if not leader:
+        if flight.done.wait(WAIT_SECONDS):
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        return fn()
+
+    try:
+        flight.result = _run(key, fn, lookup, shared)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def stats():
+    """Calls made, calls that joined one already in flight, and calls answered
+    from the shared cache after waiting on another worker"""
+    with _lock:
+        return dict(_stats, in_flight=len(_flights))
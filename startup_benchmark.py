@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures how long a fresh worker takes to import the app, build it with
+create_app() and answer its first requests, and checks the results against a
+startup budget.
+
+Usage:
+  python3 startup_benchmark.py                      # 5 runs against ./ data
+  python3 startup_benchmark.py --runs 10 --json startup.json
+  python3 startup_benchmark.py --data-dir /path/to/csvs --import-budget-ms 800
+
+Each run is a separate interpreter, so nothing is shared between runs. The
+Kaggle update check and chart warm-up are turned off, so "first data request"
+includes loading the Hot 100 CSV on demand. Exits with status 1 when a median
+exceeds its budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Default budgets (ms, median over runs)
+BUDGETS = {
+    'import_ms': 1000,
+    'create_app_ms': 100,
+    'first_request_ms': 100,
+    'first_data_request_ms': 5000,
+}
+
+# Runs inside the child interpreter and prints one JSON line of timings
+PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+client = flask_app.test_client()
+status = client.get('/').status_code
+t3 = time.perf_counter()
+data_status = client.get('/api/artists?q=a').status_code
+t4 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'first_data_request_ms': (t4 - t3) * 1000,
+    'statuses': [status, data_status],
+    'modules': sorted(m for m in ('spotipy', 'openpyxl', 'kaggle') if m in sys.modules),
+}))
+'''
+
+
+def run_once(data_dir):
+    """Timings from one fresh interpreter"""
+    env = dict(
+        os.environ,
+        AUTO_UPDATE_DATA='false',
+        WARM_CHARTS='none',
+        CHART_MEMORY_REPORT='0',
+        PYTHONPATH=os.pathsep.join(filter(None, [str(APP_DIR), os.environ.get('PYTHONPATH')])),
+    )
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=data_dir, env=env,
+                            capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs, budgets):
+    """{metric: {median, min, max, budget, ok}}"""
+    report = {}
+    for metric, budget in budgets.items():
+        values = [run[metric] for run in runs]
+        median = statistics.median(values)
+        report[metric] = {
+            'median': round(median, 1),
+            'min': round(min(values), 1),
+            'max': round(max(values), 1),
+            'budget': budget,
+            'ok': median <= budget,
+        }
+    return report
+
+
+def print_report(report, runs):
+    print(f"\n{'metric':<24}{'median':>10}{'min':>10}{'max':>10}{'budget':>10}")
+    print("-" * 64)
+    for metric, row in report.items():
+        mark = '✓' if row['ok'] else '✗'
+        print(f"{metric:<24}{row['median']:>10.1f}{row['min']:>10.1f}{row['max']:>10.1f}"
+              f"{row['budget']:>10}  {mark}")
+    statuses = {tuple(run['statuses']) for run in runs}
+    loaded = sorted({m for run in runs for m in run['modules']})
+    print(f"\nResponse statuses: {', '.join('/'.join(map(str, s)) for s in statuses)}")
+    print(f"Heavy modules imported: {', '.join(loaded) if loaded else 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import and first-request time')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--data-dir', default=str(APP_DIR), help='directory holding the chart CSVs')
+    for metric, budget in BUDGETS.items():
+        flag = '--' + metric.replace('_ms', '').replace('_', '-') + '-budget-ms'
+        parser.add_argument(flag, dest=metric, type=float, default=budget)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+    budgets = {metric: getattr(args, metric) for metric in BUDGETS}
+
+    print("=" * 60)
+    print("Startup Benchmark")
+    print("=" * 60)
+
+    runs = []
+    for i in range(args.runs):
+        run = run_once(args.data_dir)
+        runs.append(run)
+        print(f"  run {i + 1}/{args.runs}: import {run['import_ms']:.0f} ms, "
+              f"first data request {run['first_data_request_ms']:.0f} ms")
+
+    report = summarize(runs, budgets)
+    print_report(report, runs)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'report': report, 'runs': runs}, f, indent=2)
+
+    over = [metric for metric, row in report.items() if not row['ok']]
+    print("=" * 60)
+    if over:
+        print(f"❌ Over budget: {', '.join(over)}")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Artwork Warm-Up
+Resolves artwork and artist metadata for the latest chart weeks into the
+persistent cache, so launch-day visitors don't trigger cold iTunes lookups.
+
+Usage: python3 warm_artwork.py [--weeks N] [--workers N] [--rate PER_SECOND]
+
+Safe to interrupt: every lookup is cached as it completes and entries that are
+already cached are skipped, so re-running resumes where the last run stopped.
+Only one warm-up runs at a time; further starts exit straight away.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no single-run guard
+    fcntl = None
+
+import artwork
+from charts import CHARTS
+
+PROGRESS_FILE = Path(os.environ.get('ARTWORK_WARM_PROGRESS', 'data/artwork_warm_progress.json'))
+LOCK_FILE = PROGRESS_FILE.with_suffix('.lock')
+
+
+def collect_tasks(weeks):
+    """(kind, artist, name) for every entry and artist in the latest N weeks"""
+    tasks = []
+    artists = set()
+    for chart in CHARTS.values():
+        if not chart.available:
+            continue
+        chart.load()
+        first = max(len(chart.weeks) - weeks, 0)
+        rows = chart.range_rows(first, len(chart.weeks))
+        pairs = rows[['Artist', 'Song']].astype(str).drop_duplicates()
+        for artist_name, name in pairs.itertuples(index=False):
+            tasks.append((chart.item_label, artist_name, name))
+            artists.add(artist_name)
+        print(f"✓ {chart.title}: {len(pairs)} entries in the latest {len(chart.weeks) - first} weeks")
+
+    tasks.extend((artwork.KIND_ARTIST, artist_name, '') for artist_name in sorted(artists))
+    return tasks
+
+
+def acquire_run_lock():
+    """Lock file held for the rest of this run (True where flock isn't
+    available), or None if another warm-up holds it. The OS drops the lock
+    when a run exits, however it exits."""
+    if fcntl is None:
+        return True
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def save_progress(progress):
+    PROGRESS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(PROGRESS_FILE, 'w') as f:
+        json.dump(progress, f, indent=2)
+
+
+def warm(weeks=4, workers=4, rate=5.0):
+    """Warm the artwork cache; returns the final progress dict"""
+    tasks = collect_tasks(weeks)
+    pending = [t for t in tasks if not artwork.cache_get(t[0], t[1], t[2])[0]]
+    print(f"\n🎨 {len(tasks)} lookups, {len(tasks) - len(pending)} already cached, {len(pending)} to fetch")
+
+    limiter = artwork.HostRateLimiter(rate)
+    spotify = artwork.spotify_client()
+
+    def run(task):
+        kind, artist_name, name = task
+        if kind == artwork.KIND_ARTIST:
+            return artwork.get_artist_metadata(artist_name, spotify, limiter)[0]
+        return artwork.get_artwork(kind, artist_name, name, limiter)[0]
+
+    progress = {
+        'total': len(tasks),
+        'cached': len(tasks) - len(pending),
+        'fetched': 0,
+        'not_found': 0,
+        'errors': 0,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'finished_at': None,
+    }
+    started = time.time()
+
+    # Bounded concurrency; the limiter spaces requests per upstream host
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, task): task for task in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            kind, artist_name, name = futures[future]
+            try:
+                payload = future.result()
+                progress['fetched'] += 1
+                if payload is None:
+                    progress['not_found'] += 1
+            except Exception as e:
+                progress['errors'] += 1
+                print(f"✗ {kind} '{name or artist_name}': {e}")
+
+            if done % 25 == 0 or done == len(pending):
+                rate_done = done / max(time.time() - started, 0.001)
+                print(f"  [{done}/{len(pending)}] {rate_done:.1f} lookups/s, "
+                      f"{progress['not_found']} not found, {progress['errors']} errors")
+                save_progress(progress)
+
+    progress['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    save_progress(progress)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-warm the artwork cache for recent chart weeks')
+    parser.add_argument('--weeks', type=int, default=int(os.environ.get('ARTWORK_WARM_WEEKS', '4')))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=5.0, help='max requests per second per host')
+    args = parser.parse_args()
+
+    # Each web worker may start one after a data update; each loads every chart
+    lock = acquire_run_lock()
+    if lock is None:
+        print("⏭️  Artwork warm-up already running - skipping")
+        return
+
+    print("=" * 60)
+    print("Artwork Warm-Up")
+    print("=" * 60)
+
+    progress = warm(args.weeks, args.workers, args.rate)
+
+    print(f"\n✅ Warm-up complete: {progress['fetched']} fetched, "
+          f"{progress['cached']} already cached, {progress['errors']} errors")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ Downloads latest data every Wednesday from Kaggle
 """
 import os
 import subprocess
+import sys
 from datetime import datetime
 from pathlib import Path
 
@@ -12,6 +13,83 @@ def is_wednesday():
     """Check if today is Wednesday"""
     return datetime.now().weekday() == 2  # 0=Monday, 2=Wednesday
 
+# Chart CSVs normalized after each download
+INGEST_FILES = ['hot100.csv', 'billboard200.csv']
+REQUIRED_COLUMNS = {'Date', 'Song', 'Artist', 'Rank'}
+
+# Rows per chunk - peak memory during ingest is proportional to this
+CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', '50000'))
+
+# Fixed-size bitmap of seen (week, rank) pairs for de-duplication:
+# one bit per rank slot for every week from 1950 to ~2100
+EPOCH = '1950-01-07'  # a Saturday
+MAX_WEEKS = 8000
+RANK_SLOTS = 256
+
+def normalize_chart_csv(src, dst, chunksize=CHUNK_SIZE):
+    """Stream a chart CSV through date/artist normalization into dst
+
+    Dates move to the chart week's Saturday, pipe separators in artist names
+    become commas, rows with an unreadable date or rank are dropped and only
+    the first row for each (date, rank) is kept. Output is written chunk by
+    chunk to a temporary file that replaces dst at the end, so src and dst
+    may be the same file.
+    """
+    import numpy as np
+    import pandas as pd
+
+    seen = np.zeros(MAX_WEEKS * RANK_SLOTS // 8, dtype=np.uint8)
+    epoch = pd.Timestamp(EPOCH)
+    stats = {'rows': 0, 'duplicates': 0, 'invalid': 0, 'min_date': None, 'max_date': None}
+
+    tmp = Path(f"{dst}.tmp")
+    first_chunk = True
+    for chunk in pd.read_csv(src, chunksize=chunksize, low_memory=False):
+        if first_chunk:
+            missing = REQUIRED_COLUMNS - set(chunk.columns)
+            if missing:
+                raise ValueError(f"{src} is missing columns: {', '.join(sorted(missing))}")
+
+        # Vectorized: shift every date forward to its Saturday (5 = Saturday)
+        dates = pd.to_datetime(chunk['Date'], errors='coerce')
+        dates = dates + pd.to_timedelta((5 - dates.dt.weekday) % 7, unit='D')
+        ranks = pd.to_numeric(chunk['Rank'], errors='coerce')
+        week = (dates - epoch).dt.days // 7
+
+        valid = (dates.notna() & ranks.between(1, RANK_SLOTS - 1)
+                 & week.between(0, MAX_WEEKS - 1)).to_numpy()
+        stats['invalid'] += int((~valid).sum())
+        chunk, dates, ranks, week = chunk[valid], dates[valid], ranks[valid], week[valid]
+
+        # Keep the first row per (week, rank), within and across chunks
+        keys = week.to_numpy(dtype=np.int64) * RANK_SLOTS + ranks.to_numpy(dtype=np.int64)
+        _, first = np.unique(keys, return_index=True)
+        unique = np.zeros(len(keys), dtype=bool)
+        unique[first] = True
+        already = (seen[keys >> 3] & (1 << (keys & 7)).astype(np.uint8)) != 0
+        keep = unique & ~already
+        np.bitwise_or.at(seen, keys[keep] >> 3, (1 << (keys[keep] & 7)).astype(np.uint8))
+        stats['duplicates'] += int((~keep).sum())
+
+        chunk = chunk[keep].copy()
+        chunk['Date'] = dates[keep].dt.strftime('%Y-%m-%d')
+        # A chunk whose credits are all missing reads as floats, not strings
+        chunk['Artist'] = chunk['Artist'].fillna('').astype(str).str.replace('|', ',', regex=False)
+
+        if len(chunk):
+            low, high = chunk['Date'].min(), chunk['Date'].max()
+            stats['min_date'] = min(stats['min_date'] or low, low)
+            stats['max_date'] = max(stats['max_date'] or high, high)
+        stats['rows'] += len(chunk)
+
+        chunk.to_csv(tmp, mode='w' if first_chunk else 'a', header=first_chunk, index=False)
+        first_chunk = False
+
+    if first_chunk:
+        raise ValueError(f"{src} is empty")
+    os.replace(tmp, dst)
+    return stats
+
 def download_billboard_data():
     """Download latest Billboard data from Kaggle"""
     print("📥 Downloading latest Billboard data from Kaggle...")
@@ -36,47 +114,39 @@ def download_billboard_data():
         os.remove('billboard.zip')
 
         # Check if hot100.csv exists
-        if Path('hot100.csv').exists():
-            # Fix dates to be Saturdays (Billboard standard)
-            print("🔧 Correcting dates to Saturdays...")
-            import pandas as pd
-            from datetime import timedelta
-
-            df = pd.read_csv('hot100.csv', low_memory=False)
-            df['Date'] = pd.to_datetime(df['Date'])
-
-            # Convert all dates to nearest Saturday
-            def to_saturday(date):
-                days_ahead = 5 - date.weekday()  # 5 = Saturday
-                if days_ahead < 0:
-                    days_ahead += 7
-                return date + timedelta(days=days_ahead)
-
-            df['Date'] = df['Date'].apply(to_saturday)
-
-            # Clean up pipe characters in artist names
-            def clean_artist_name(artist):
-                if pd.isna(artist):
-                    return artist
-                return artist.replace('|', ',')
-
-            df['Artist'] = df['Artist'].apply(clean_artist_name)
-            df.to_csv('hot100.csv', index=False)
-
-            size_mb = Path('hot100.csv').stat().st_size / (1024 * 1024)
-            mod_time = datetime.fromtimestamp(Path('hot100.csv').stat().st_mtime)
-            print(f"✅ Updated hot100.csv ({size_mb:.1f} MB)")
-            print(f"📅 File date: {mod_time.strftime('%Y-%m-%d %H:%M')}")
-            print(f"📊 Date range: {df['Date'].min()} to {df['Date'].max()}")
-            return True
-        else:
+        if not Path('hot100.csv').exists():
             print("❌ hot100.csv not found in downloaded data")
             return False
 
+        for filename in INGEST_FILES:
+            if not Path(filename).exists():
+                continue
+
+            # Fix dates to be Saturdays (Billboard standard), streaming in chunks
+            print(f"🔧 Normalizing {filename}...")
+            stats = normalize_chart_csv(filename, filename)
+
+            size_mb = Path(filename).stat().st_size / (1024 * 1024)
+            mod_time = datetime.fromtimestamp(Path(filename).stat().st_mtime)
+            print(f"✅ Updated {filename} ({size_mb:.1f} MB)")
+            print(f"📅 File date: {mod_time.strftime('%Y-%m-%d %H:%M')}")
+            print(f"📊 Date range: {stats['min_date']} to {stats['max_date']}")
+            print(f"🧹 {stats['rows']} rows kept, {stats['duplicates']} duplicate and "
+                  f"{stats['invalid']} invalid rows dropped")
+        return True
+
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
+def warm_artwork_cache():
+    """Resolve artwork for the new chart weeks before visitors ask for it"""
+    print("\n🎨 Pre-warming artwork cache...")
+    try:
+        subprocess.run([sys.executable, 'warm_artwork.py'], check=True)
+    except Exception as e:
+        print(f"⚠️  Artwork warm-up failed: {e}")
+
 def main():
     """Main function"""
     print("="*60)
@@ -98,6 +168,7 @@ def main():
 
         if success:
             print("\n✅ Update complete!")
+            warm_artwork_cache()
         else:
             print("\n❌ Update failed!")
     else: